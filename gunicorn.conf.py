@@ -0,0 +1,65 @@
+"""
+gunicorn.conf.py
+Picked up automatically by gunicorn (render.yaml startCommand).
+
+Runs the generation job worker (tools/job_worker.py) as a separate process next
+to the web workers: started once the server is ready, restarted by a watchdog
+thread if it crashes (a clean exit means it was told to stop), and sent SIGTERM on
+shutdown so it drains (finishes or hands back running jobs) before the container
+stops. Set JOB_WORKER_EMBEDDED=false when workers run elsewhere.
+"""
+
+import os
+import sys
+import signal
+import threading
+import subprocess
+from pathlib import Path
+
+WATCHDOG_SECONDS = 5
+_worker = None
+_stopping = threading.Event()
+
+
+def _start_worker():
+    return subprocess.Popen([sys.executable, str(Path(__file__).parent / "tools" / "job_worker.py")])
+
+
+def _watchdog(server):
+    global _worker
+    backoff = WATCHDOG_SECONDS
+    while not _stopping.wait(WATCHDOG_SECONDS):
+        code = _worker.poll()
+        if code is None:
+            backoff = WATCHDOG_SECONDS
+            continue
+        if code == 0:
+            continue                            # drained after SIGTERM — shutting down, not crashed
+        server.log.warning("Job worker exited with %s — restarting in %ss", code, backoff)
+        if _stopping.wait(backoff):
+            return
+        backoff = min(backoff * 2, 60)          # a worker that dies on start doesn't spin
+        _worker = _start_worker()
+        server.log.info("Job worker restarted (pid %s)", _worker.pid)
+
+
+def when_ready(server):
+    global _worker
+    if os.environ.get("JOB_WORKER_EMBEDDED", "true").lower() != "true":
+        return
+    _worker = _start_worker()
+    server.log.info("Job worker started (pid %s)", _worker.pid)
+    threading.Thread(target=_watchdog, args=(server,), name="job-worker-watchdog", daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _worker is None or _worker.poll() is not None:
+        return
+    _worker.send_signal(signal.SIGTERM)
+    try:
+        # The worker releases unfinished jobs at its drain deadline; a few seconds on
+        # top for that, still inside Render's 30 s SIGTERM → SIGKILL window
+        _worker.wait(timeout=int(os.environ.get("JOB_DRAIN_SECONDS", "25")) + 3)
+    except subprocess.TimeoutExpired:
+        _worker.kill()
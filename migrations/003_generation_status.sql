@@ -0,0 +1,34 @@
+-- WebsiteRevive — explicit job status on generations
+-- Run this in Supabase SQL Editor (supabase.com → your project → SQL Editor)
+-- AFTER 002_hosted_sites.sql, right before deploying the code that uses it.
+--
+-- Job state used to be encoded as "##GENERATING##:<ts>", "##PENDING##:<json>" and
+-- "##ERROR##:<msg>" prefixes inside full_html, so every /status poll downloaded the
+-- whole page just to read a prefix. It now lives in its own small columns.
+
+-- Idempotent: safe to re-run.
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS status       TEXT;          -- queued | generating | hero_ready | pending | done | error
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS stage        TEXT;          -- pipeline stage being worked on (scrape … package)
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS started_at   TIMESTAMPTZ;
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS finished_at  TIMESTAMPTZ;
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS error        TEXT;
+ALTER TABLE generations ADD COLUMN IF NOT EXISTS preview_meta JSONB;         -- business_name / form_type shown with the hero
+
+-- Backfill existing rows from the old sentinel prefixes
+UPDATE generations SET
+  status = CASE
+    WHEN full_html LIKE '##GENERATING##%' THEN 'generating'
+    WHEN full_html LIKE '##PENDING##:%'   THEN 'pending'
+    WHEN full_html LIKE '##ERROR##:%'     THEN 'error'
+    ELSE 'done'
+  END,
+  error = CASE WHEN full_html LIKE '##ERROR##:%' THEN substr(full_html, 11) END,
+  started_at = CASE
+    WHEN full_html ~ '^##GENERATING##:[0-9]+' THEN to_timestamp(split_part(full_html, ':', 2)::bigint)
+    ELSE created_at
+  END,
+  finished_at = CASE WHEN full_html NOT LIKE '##%' OR full_html LIKE '##ERROR##:%' THEN created_at END
+WHERE status IS NULL;
+
+ALTER TABLE generations ALTER COLUMN status SET DEFAULT 'queued';
+ALTER TABLE generations ALTER COLUMN status SET NOT NULL;
@@ -0,0 +1,160 @@
+"""
+artifact_store.py
+Content-addressed store for packaged deliveries (preview HTML + download ZIP).
+
+Packaging — bundling remote images, splitting pages, stamping <img> attributes,
+zipping — used to run on every /status poll of a finished job and on every
+/unlock. It now runs once per generation, at the end of the full-site job, and the
+result is kept here:
+
+  .tmp/artifacts/blobs/<sha256>                  → file bytes (index.html, site.zip)
+  .tmp/artifacts/manifests/<generation_id>.json  → {files: {name: {sha256, bytes}}, slug, pages, images, ...}
+
+Identical outputs share one blob. build_once() holds a per-generation file lock,
+so the job, both gunicorn workers and a retry never package the same generation
+concurrently; whoever comes second reads the first one's manifest. Least-recently
+used blobs are evicted past ARTIFACT_STORE_MAX_MB — a generation whose blobs are
+gone is simply packaged again on its next request (load() also covers a blob
+evicted between finding the manifest and reading it).
+
+Usage:
+    import artifact_store
+    manifest = artifact_store.build_once(generation_id, lambda: ({"index.html": html, "site.zip": zip_bytes}, {}))
+    files = artifact_store.load(generation_id, build)     # {name: bytes}, (re)packaged if needed
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+STORE_DIR = Path(__file__).parent.parent / ".tmp" / "artifacts"
+MAX_BYTES = int(os.environ.get("ARTIFACT_STORE_MAX_MB", "500")) * 1024 * 1024
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _blob_path(digest: str) -> Path:
+    return STORE_DIR / "blobs" / digest
+
+
+def _manifest_path(generation_id: str) -> Path:
+    return STORE_DIR / "manifests" / f"{generation_id}.json"
+
+
+def get(generation_id: str) -> dict | None:
+    """Manifest of the generation's packaged artifact, or None if it has none (or
+    one of its blobs was evicted)."""
+    try:
+        manifest = json.loads(_manifest_path(generation_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not all(_blob_path(f["sha256"]).is_file() for f in manifest["files"].values()):
+        return None
+    return manifest
+
+
+def read(manifest: dict, name: str) -> bytes:
+    """Bytes of one file of the artifact. Raises FileNotFoundError if its blob has
+    been evicted since the manifest was loaded — use load() to recover from that."""
+    path = _blob_path(manifest["files"][name]["sha256"])
+    data = path.read_bytes()
+    os.utime(path)                                   # LRU clock
+    return data
+
+
+def put(generation_id: str, files: dict, **info) -> dict:
+    """Store files ({name: bytes | str}) content-addressed and write the manifest."""
+    entries = {}
+    for name, data in files.items():
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            os.utime(_blob_path(digest))             # deduplicated: now recent, so evict() keeps it
+        except FileNotFoundError:
+            _atomic_write(_blob_path(digest), data)
+        entries[name] = {"sha256": digest, "bytes": len(data)}
+    manifest = {"generation_id": generation_id, "created_at": time.time(), "files": entries, **info}
+    _atomic_write(_manifest_path(generation_id), json.dumps(manifest).encode("utf-8"))
+    evict()
+    return manifest
+
+
+def build_once(generation_id: str, build) -> dict:
+    """The generation's manifest — packaged by build() → ({name: bytes | str}, info)
+    only if no artifact exists yet, with at most one builder at a time."""
+    manifest = get(generation_id)
+    if manifest:
+        return manifest
+    try:
+        import fcntl                                 # POSIX only — always there under gunicorn
+    except ImportError:
+        fcntl = None                                 # Windows dev server: one process, no lock needed
+    lock_path = STORE_DIR / "locks" / f"{generation_id}.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)         # a concurrent builder finishes first
+        manifest = get(generation_id)
+        if manifest:
+            return manifest
+        files, info = build()
+        manifest = put(generation_id, files, **info)
+        # Removed while still held: anyone who locks the old inode or a new file
+        # after this finds the manifest written above and doesn't rebuild
+        lock_path.unlink(missing_ok=True)
+    size = sum(f["bytes"] for f in manifest["files"].values())
+    print(f"[artifacts] Packaged {generation_id}: {len(files)} file(s), {size // 1024}KB")
+    return manifest
+
+
+def load(generation_id: str, build, names: tuple | None = None) -> dict:
+    """{name: bytes} of the generation's artifact (all files, or just `names`),
+    packaged with build_once() if needed. A blob evicted between finding the
+    manifest and reading it makes the manifest incomplete, so the second
+    build_once() repackages it."""
+    for attempt in (1, 2):
+        manifest = build_once(generation_id, build)
+        try:
+            return {name: read(manifest, name) for name in (names or tuple(manifest["files"]))}
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+            print(f"[artifacts] {generation_id}: blob evicted while reading — packaging again")
+
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    """Delete least-recently-used blobs until the store fits in max_bytes. Returns
+    the number of bytes freed."""
+    d = STORE_DIR / "blobs"
+    if not d.is_dir():
+        return 0
+    files, total = [], 0
+    for entry in os.scandir(d):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    for _, size, path in sorted(files):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)         # manifests pointing at it read as "not packaged" next time
+            freed += size
+        except OSError:
+            pass
+    print(f"[artifacts] Evicted {freed // 1024}KB (store was {total // 1024}KB)")
+    return freed
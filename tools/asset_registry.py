@@ -0,0 +1,181 @@
+"""
+asset_registry.py
+In-process registry of the static design assets used during generation:
+motifs/ (Phosphor SVG icons), illustrations/ (unDraw SVGs) and tools/ux_data/
+(ui-ux-pro-max typography + colour CSVs).
+
+Loaded once per worker instead of re-reading JSON indexes, SVG files and CSVs on
+every generation:
+  • SVGs are stored pre-cleaned and minified — motifs without comments,
+    illustrations additionally recoloured to var(--clr-primary) and made responsive
+  • typography rows have an inverted keyword index (query word → matching rows,
+    same substring semantics as the old linear scan, memoized per word)
+  • palettes are a dict keyed by lower-cased "Product Type"
+The registry notices edited asset files (mtime check at most every
+ASSET_RELOAD_SECONDS) and rebuilds itself; reload() forces it.
+
+Usage:
+    from asset_registry import get_registry
+    reg = get_registry()
+    reg.motif_svg("hammer"), reg.font_pairing(["premium", "craft"]), reg.palette("b2b service")
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import threading
+from pathlib import Path
+
+MOTIF_DIR   = Path(__file__).parent.parent / "motifs"
+ILLUS_DIR   = Path(__file__).parent.parent / "illustrations"
+UX_DATA_DIR = Path(__file__).parent / "ux_data"
+RELOAD_CHECK_SECONDS = int(os.environ.get("ASSET_RELOAD_SECONDS", "30"))
+
+_ILLUS_ACCENTS = ("#6c63ff", "#6C63FF", "#7f77ff", "#7F77FF")
+
+
+def _minify_svg(svg: str) -> str:
+    return re.sub(r">\s+<", "><", svg).strip()
+
+
+def _clean_motif(svg: str) -> str:
+    return _minify_svg(re.sub(r"<!--.*?-->", "", svg, flags=re.DOTALL))
+
+
+def _clean_illustration(svg: str) -> str:
+    """Strip XML decl/comments, swap the unDraw accent purple for the brand colour
+    and make the root <svg> scale to its container."""
+    svg = re.sub(r"<\?xml.*?\?>", "", svg, flags=re.DOTALL)
+    svg = re.sub(r"<!--.*?-->", "", svg, flags=re.DOTALL)
+    for accent in _ILLUS_ACCENTS:
+        svg = svg.replace(accent, "var(--clr-primary,#6c63ff)")
+    # drop fixed width/height on the root <svg>, add a responsive style
+    svg = re.sub(r'(<svg\b[^>]*?)\s+width="[^"]*"', r"\1", svg, count=1)
+    svg = re.sub(r'(<svg\b[^>]*?)\s+height="[^"]*"', r"\1", svg, count=1)
+    svg = re.sub(r"<svg\b", '<svg style="width:100%;height:auto;display:block;max-height:78vh" ', svg, count=1)
+    return _minify_svg(svg)
+
+
+def _read_json_map(path: Path, tag: str) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("industry_map", {})
+    except Exception as e:
+        print(f"[{tag}] index.json error ({e})")
+        return {}
+
+
+def _read_csv(fname: str) -> list:
+    p = UX_DATA_DIR / fname
+    if not p.exists():
+        return []
+    try:
+        with open(p, encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except Exception as e:
+        print(f"[ux] {fname} read error ({e})")
+        return []
+
+
+def _signature() -> tuple:
+    """mtimes of every watched file — changes when an asset is added/edited/removed."""
+    sig = []
+    for d, pattern in ((MOTIF_DIR, "*"), (ILLUS_DIR, "*"), (UX_DATA_DIR, "*.csv")):
+        if d.is_dir():
+            for p in sorted(d.glob(pattern)):
+                try:
+                    sig.append((p.name, p.stat().st_mtime_ns))
+                except OSError:
+                    pass
+    return tuple(sig)
+
+
+class AssetRegistry:
+    def __init__(self):
+        self.signature = _signature()
+        self.checked_at = time.monotonic()
+
+        self.motif_map = _read_json_map(MOTIF_DIR / "index.json", "motifs")
+        self.motifs = {p.stem: _clean_motif(p.read_text(encoding="utf-8"))
+                       for p in MOTIF_DIR.glob("*.svg")} if MOTIF_DIR.is_dir() else {}
+
+        self.illus_map = _read_json_map(ILLUS_DIR / "index.json", "illus")
+        self.illustrations = {p.name: _clean_illustration(p.read_text(encoding="utf-8"))
+                              for p in ILLUS_DIR.glob("*.svg")} if ILLUS_DIR.is_dir() else {}
+
+        self.fonts = _read_csv("typography.csv")
+        self._font_hay = [(r.get("Best For", "") + " " + r.get("Mood/Style Keywords", "") + " " +
+                           r.get("Category", "")).lower() for r in self.fonts]
+        self._font_postings: dict = {}          # word → frozenset of row indexes
+        self._postings_lock = threading.Lock()
+
+        self.palettes = {}
+        for r in _read_csv("colors.csv"):
+            self.palettes.setdefault(r.get("Product Type", "").strip().lower(), r)
+
+        print(f"[assets] Loaded {len(self.motifs)} motif(s), {len(self.illustrations)} illustration(s), "
+              f"{len(self.fonts)} font pairing(s), {len(self.palettes)} palette(s)")
+
+    def motif_svg(self, name: str) -> str | None:
+        return self.motifs.get(name)
+
+    def illustration_svg(self, fname: str) -> str | None:
+        return self.illustrations.get(fname)
+
+    def _postings(self, word: str) -> frozenset:
+        hit = self._font_postings.get(word)
+        if hit is None:
+            hit = frozenset(i for i, hay in enumerate(self._font_hay) if word in hay)
+            with self._postings_lock:
+                self._font_postings[word] = hit
+        return hit
+
+    def font_pairing(self, qwords: list[str]) -> dict | None:
+        """Row matching the most query words (substring match on Best For / Mood /
+        Category); ties go to the earlier row, no match at all to the first row."""
+        if not self.fonts:
+            return None
+        scores: dict = {}
+        for w in qwords:
+            for i in self._postings(w):
+                scores[i] = scores.get(i, 0) + 1
+        if not scores:
+            return self.fonts[0]
+        best = max(scores.items(), key=lambda kv: (kv[1], -kv[0]))[0]
+        return self.fonts[best]
+
+    def palette(self, product_type: str) -> dict | None:
+        return self.palettes.get(product_type.strip().lower())
+
+
+_registry: AssetRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> AssetRegistry:
+    """Process-wide registry; rebuilt when asset files have changed on disk."""
+    global _registry
+    reg = _registry
+    if reg is not None and time.monotonic() - reg.checked_at < RELOAD_CHECK_SECONDS:
+        return reg
+    with _registry_lock:
+        if _registry is None:
+            _registry = AssetRegistry()
+        elif time.monotonic() - _registry.checked_at >= RELOAD_CHECK_SECONDS:
+            if _signature() != _registry.signature:
+                print("[assets] Asset files changed — reloading registry")
+                _registry = AssetRegistry()
+            else:
+                _registry.checked_at = time.monotonic()
+        return _registry
+
+
+def reload() -> AssetRegistry:
+    """Force a rebuild (e.g. after deploying new motifs/illustrations)."""
+    global _registry
+    with _registry_lock:
+        _registry = AssetRegistry()
+        return _registry
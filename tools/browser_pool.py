@@ -0,0 +1,215 @@
+"""
+browser_pool.py
+Long-lived Playwright Chromium pool shared by every screenshot / JS render.
+
+Launching Chromium costs seconds and a lot of memory, so each worker process keeps
+a small, fixed number of browsers alive and reuses them across requests:
+  • size-bounded: BROWSER_POOL_SIZE render threads, one browser each — this is also
+    the concurrency cap (the Playwright sync API is bound to the thread that
+    started it, so every browser lives on its own thread and jobs are queued to it)
+  • contexts are recycled after BROWSER_PAGES_PER_CONTEXT pages
+  • a crashed/disconnected browser is relaunched on the next job
+  • a job whose caller timed out is skipped if it has not started, and every
+    Playwright call on a pooled page is capped (BROWSER_ACTION_TIMEOUT_MS), so a
+    hung page can't hold a browser slot indefinitely
+  • render profile: fonts, media and known third-party trackers are blocked, and the
+    blanket networkidle/30 s wait is replaced by a bounded settle (DOM ready → load
+    → short networkidle window, each capped)
+
+Usage:
+    from browser_pool import get_pool
+    pool = get_pool()              # None if Playwright is not installed
+    if pool:
+        html = pool.run(lambda page: (page.goto(url), page.content())[1])
+"""
+
+import os
+import queue
+import atexit
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+POOL_SIZE         = int(os.environ.get("BROWSER_POOL_SIZE", "1"))
+PAGES_PER_CONTEXT = int(os.environ.get("BROWSER_PAGES_PER_CONTEXT", "20"))
+NAV_TIMEOUT_MS    = int(os.environ.get("BROWSER_NAV_TIMEOUT_MS", "15000"))
+SETTLE_MS         = int(os.environ.get("BROWSER_SETTLE_MS", "2500"))
+ACTION_TIMEOUT_MS = int(os.environ.get("BROWSER_ACTION_TIMEOUT_MS", "20000"))
+VIEWPORT          = {"width": 1280, "height": 800}
+LAUNCH_ARGS       = ["--no-sandbox", "--disable-dev-shm-usage"]
+
+BLOCKED_RESOURCE_TYPES = {"font", "media"}
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "facebook.net",
+    "connect.facebook.com", "hotjar.com", "clarity.ms", "segment.io",
+    "segment.com", "mixpanel.com", "matomo", "piwik", "hubspot.com",
+    "hs-analytics.net", "linkedin.com/px", "snap.licdn.com", "tiktok.com/i18n",
+    "analytics.tiktok.com", "bat.bing.com", "cookiebot.com", "usercentrics",
+    "onetrust.com", "cookielaw.org", "intercom.io", "crisp.chat", "tawk.to",
+)
+
+
+def _route_handler(route):
+    req = route.request
+    if req.resource_type in BLOCKED_RESOURCE_TYPES:
+        return route.abort()
+    url = req.url.lower()
+    if any(t in url for t in TRACKER_HOSTS):
+        return route.abort()
+    return route.continue_()
+
+
+class RenderAborted(Exception):
+    """The caller gave up on a job that had already started (see check_abort)."""
+
+
+def check_abort(abort, url: str = "") -> None:
+    """Raise RenderAborted once `abort` (a threading.Event, or None) is set — a
+    started job can't be cancelled through its Future, so it checks this between
+    stages and frees the browser for the next job."""
+    if abort is not None and abort.is_set():
+        raise RenderAborted(f"render of {url} aborted by the caller")
+
+
+def goto_and_settle(page, url: str, nav_timeout_ms: int = NAV_TIMEOUT_MS, settle_ms: int = SETTLE_MS,
+                    abort=None):
+    """Navigate with a bounded settle instead of waiting for full networkidle.
+    Returns the Playwright response (may be None). Only the initial navigation can
+    raise; the settle phases are best-effort and simply stop at their cap.
+    `abort` is checked before and after each stage (raises RenderAborted)."""
+    check_abort(abort, url)
+    resp = page.goto(url, wait_until="domcontentloaded", timeout=nav_timeout_ms)
+    for state, cap in (("load", settle_ms * 2), ("networkidle", settle_ms)):
+        check_abort(abort, url)
+        try:
+            page.wait_for_load_state(state, timeout=cap)
+        except Exception:
+            pass
+    check_abort(abort, url)
+    return resp
+
+
+class _Worker(threading.Thread):
+    """Owns one Playwright instance + browser; runs queued jobs one at a time."""
+
+    def __init__(self, jobs: "queue.Queue", idx: int):
+        super().__init__(name=f"browser-pool-{idx}", daemon=True)
+        self.jobs = jobs
+        self.pw = None
+        self.browser = None
+        self.context = None
+        self.pages_in_context = 0
+
+    def _ensure_browser(self):
+        from playwright.sync_api import sync_playwright
+        if self.pw is None:
+            self.pw = sync_playwright().start()
+        if self.browser is None or not self.browser.is_connected():
+            self._close_browser()
+            print(f"[browser-pool] {self.name}: launching Chromium")
+            self.browser = self.pw.chromium.launch(args=LAUNCH_ARGS)
+        if self.context is None or self.pages_in_context >= PAGES_PER_CONTEXT:
+            if self.context is not None:
+                try:
+                    self.context.close()
+                except Exception:
+                    pass
+            self.context = self.browser.new_context(viewport=VIEWPORT)
+            self.context.set_default_timeout(ACTION_TIMEOUT_MS)
+            self.context.set_default_navigation_timeout(NAV_TIMEOUT_MS)
+            self.context.route("**/*", _route_handler)
+            self.pages_in_context = 0
+
+    def _close_browser(self):
+        for obj in (self.context, self.browser):
+            try:
+                if obj is not None:
+                    obj.close()
+            except Exception:
+                pass
+        self.context = None
+        self.browser = None
+        self.pages_in_context = 0
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            fn, fut = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            page = None
+            try:
+                self._ensure_browser()
+                page = self.context.new_page()
+                self.pages_in_context += 1
+                fut.set_result(fn(page))
+            except Exception as e:
+                fut.set_exception(e)
+                # Crashed/disconnected browser → relaunch on the next job
+                if self.browser is not None and not self.browser.is_connected():
+                    print(f"[browser-pool] {self.name}: browser died ({e}) — will restart")
+                    self._close_browser()
+            finally:
+                if page is not None:
+                    try:
+                        page.close()
+                    except Exception:
+                        pass
+        self._close_browser()
+        if self.pw is not None:
+            try:
+                self.pw.stop()
+            except Exception:
+                pass
+
+
+class BrowserPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.jobs: queue.Queue = queue.Queue()
+        self.workers = [_Worker(self.jobs, i) for i in range(max(1, size))]
+        for w in self.workers:
+            w.start()
+
+    def run(self, fn, timeout: float | None = 60):
+        """Run fn(page) on a pooled browser page and return its result. Blocks until
+        a browser is free; raises concurrent.futures.TimeoutError after `timeout`
+        (a job that has not started by then is dropped from the queue)."""
+        fut = self.submit(fn)
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            fut.cancel()
+            raise
+
+    def submit(self, fn) -> Future:
+        """Non-blocking variant of run() — returns the Future. Cancel it when giving
+        up on the result so a queued job doesn't occupy a browser for nothing."""
+        fut: Future = Future()
+        self.jobs.put((fn, fut))
+        return fut
+
+    def shutdown(self) -> None:
+        for _ in self.workers:
+            self.jobs.put(None)
+
+
+_pool: BrowserPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool | None:
+    """Process-wide pool, created on first use. None if Playwright is missing."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    import playwright.sync_api  # noqa: F401
+                except ImportError:
+                    return None
+                _pool = BrowserPool()
+                atexit.register(_pool.shutdown)
+                print(f"[browser-pool] Started {len(_pool.workers)} browser worker(s)")
+    return _pool
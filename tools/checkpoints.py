@@ -0,0 +1,91 @@
+"""
+checkpoints.py
+Per-stage results of a generation, keyed by generation id, so a retried job
+resumes where the failed attempt stopped instead of starting over.
+
+  .tmp/checkpoints/<generation_id>/<stage>.json   → the stage's JSON-able result
+
+Stages, in pipeline order:
+  "generate" job:  scrape → analysis → images → hero
+  "full_site" job: full_html → postprocessed → factchecked
+(the final package is kept by artifact_store)
+
+A failure in factcheck_pass or a DB write after the 32k-token generate_website
+call no longer throws that call away: the queue retries the job and every stage
+that already finished is loaded instead of recomputed. Writes are atomic; a
+generation's checkpoints are removed CHECKPOINT_TTL_HOURS after its last write.
+
+Usage:
+    import checkpoints
+    html = checkpoints.run_stage(generation_id, "full_html", lambda: generate_website(...))
+"""
+
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+
+CHECKPOINT_DIR = Path(__file__).parent.parent / ".tmp" / "checkpoints"
+TTL_SECONDS    = int(os.environ.get("CHECKPOINT_TTL_HOURS", "72")) * 3600
+STAGES = ("scrape", "analysis", "images", "hero", "full_html", "postprocessed", "factchecked")
+
+
+def _path(generation_id: str, stage: str) -> Path:
+    if stage not in STAGES:
+        raise ValueError(f"unknown checkpoint stage '{stage}'")
+    return CHECKPOINT_DIR / generation_id / f"{stage}.json"
+
+
+def save(generation_id: str, stage: str, value) -> None:
+    path = _path(generation_id, stage)
+    if not path.parent.exists():
+        prune()                                   # new generation — good moment to drop old ones
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load(generation_id: str, stage: str):
+    """Saved result of stage, or None if it never completed."""
+    try:
+        return json.loads(_path(generation_id, stage).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def run_stage(generation_id: str, stage: str, compute):
+    """Saved result of stage if there is one, else compute(), saved before it is returned."""
+    value = load(generation_id, stage)
+    if value is not None:
+        print(f"[checkpoint] {generation_id} {stage}: resuming from saved result")
+        return value
+    value = compute()
+    try:
+        save(generation_id, stage, value)
+    except OSError as e:
+        print(f"[checkpoint] {generation_id} {stage}: could not save ({e})")
+    return value
+
+
+def clear(generation_id: str) -> None:
+    shutil.rmtree(CHECKPOINT_DIR / generation_id, ignore_errors=True)
+
+
+def prune(max_age: int = TTL_SECONDS) -> int:
+    """Remove checkpoints of generations untouched for max_age seconds. Returns how many."""
+    if not CHECKPOINT_DIR.is_dir():
+        return 0
+    cutoff, removed = time.time() - max_age, 0
+    for entry in os.scandir(CHECKPOINT_DIR):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        print(f"[checkpoint] Pruned {removed} old generation(s)")
+    return removed
@@ -5,6 +5,7 @@ All database operations go through this module.
 """
 
 import os
+from datetime import datetime, timezone
 from supabase import create_client, Client
 
 _client: Client | None = None
@@ -64,14 +65,46 @@ def add_tokens(user_id: str, amount: int) -> None:
 
 # ── Generations ───────────────────────────────────────────────────────────────
 
-def save_generation(user_id: str | None, url: str, slug: str, hero_html: str, full_html: str) -> dict:
+# Job state lives in status / stage / started_at / finished_at / error (migration 003):
+#   queued → generating → hero_ready → done, or error at any point
+#   pending = legacy deferred job whose context is still stored in full_html
+ACTIVE_STATUSES = ("queued", "generating", "hero_ready")
+_STATUS_COLUMNS = "id, user_id, slug, unlocked, status, stage, started_at, finished_at, error, preview_meta"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """timestamptz as Supabase returns it ("2024-05-01T10:00:00.12345+00:00", "...Z",
+    1-6 fraction digits) → aware datetime, or None. datetime.fromisoformat() only
+    accepts all of these forms from Python 3.11 on."""
+    import re
+    m = re.match(r"(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d(?::?\d\d)?)?$", value or "")
+    if not m:
+        return None
+    date, clock, frac, tz = m.groups()
+    if tz in (None, "Z"):
+        tz = "+00:00"
+    elif len(tz) == 3:
+        tz += ":00"
+    elif ":" not in tz:
+        tz = f"{tz[:3]}:{tz[3:]}"
+    return datetime.fromisoformat(f"{date}T{clock}.{(frac or '0')[:6].ljust(6, '0')}{tz}")
+
+
+def save_generation(user_id: str | None, url: str, slug: str, hero_html: str, full_html: str,
+                    status: str = "queued") -> dict:
     res = get_client().table("generations").insert({
-        "user_id":   user_id,
-        "url":       url,
-        "slug":      slug,
-        "hero_html": hero_html,
-        "full_html": full_html,
-        "unlocked":  False,
+        "user_id":    user_id,
+        "url":        url,
+        "slug":       slug,
+        "hero_html":  hero_html,
+        "full_html":  full_html,
+        "unlocked":   False,
+        "status":     status,
+        "started_at": _now(),
     }).execute()
     return res.data[0]
 
@@ -81,12 +114,52 @@ def get_generation(generation_id: str) -> dict | None:
     return res.data[0] if res.data else None
 
 
+def get_generation_status(generation_id: str) -> dict | None:
+    """Job state only — no hero_html/full_html, so polling never transfers page bodies."""
+    res = get_client().table("generations").select(_STATUS_COLUMNS).eq("id", generation_id).execute()
+    return res.data[0] if res.data else None
+
+
+def get_generation_field(generation_id: str, field: str) -> str | None:
+    """One body column ("hero_html" or "full_html") of a generation."""
+    res = get_client().table("generations").select(field).eq("id", generation_id).execute()
+    return res.data[0][field] if res.data else None
+
+
+def update_generation_status(generation_id: str, status: str | None = None, stage: str | None = None,
+                             error: str | None = None, restart: bool = False) -> None:
+    """Move a job along: status and/or stage. "done"/"error" also stamp finished_at;
+    restart=True stamps a fresh started_at (a job (re)starting from scratch)."""
+    fields = {}
+    if status is not None:
+        fields["status"] = status
+        if status in ("done", "error"):
+            fields["finished_at"] = _now()
+    if stage is not None:
+        fields["stage"] = stage
+    if error is not None:
+        fields["error"] = error
+    if restart:
+        fields.update({"started_at": _now(), "finished_at": None, "error": None})
+    get_client().table("generations").update(fields).eq("id", generation_id).execute()
+
+
 def mark_unlocked(generation_id: str) -> None:
     get_client().table("generations").update({"unlocked": True}).eq("id", generation_id).execute()
 
 
 def update_full_html(generation_id: str, full_html: str) -> None:
-    get_client().table("generations").update({"full_html": full_html}).eq("id", generation_id).execute()
+    """Store the finished site and mark the job done."""
+    get_client().table("generations").update({
+        "full_html": full_html, "status": "done", "finished_at": _now(),
+    }).eq("id", generation_id).execute()
+
+
+def update_hero_html(generation_id: str, hero_html: str, preview_meta: dict) -> None:
+    """Store the hero preview and mark the job hero_ready, in one write."""
+    get_client().table("generations").update({
+        "hero_html": hero_html, "preview_meta": preview_meta, "status": "hero_ready",
+    }).eq("id", generation_id).execute()
 
 
 # ── Hosted Sites ──────────────────────────────────────────────────────────────
@@ -12,8 +12,9 @@ Output:
 import sys
 import os
 import json
-import random
 import base64
+import hashlib
+import threading
 import argparse
 from pathlib import Path
 
@@ -22,12 +23,11 @@ from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent.parent / ".env")
 
 import anthropic
-from scrape_site import scrape, slugify
+import http_client
+from html_index import PageIndex, build_index
+from scrape_site import scrape, scrape_subpages, slugify
 
 REFERENCE_DIR = Path(__file__).parent.parent / "reference_designs"
-MOTIF_DIR = Path(__file__).parent.parent / "motifs"
-ILLUS_DIR = Path(__file__).parent.parent / "illustrations"
-UX_DATA_DIR = Path(__file__).parent / "ux_data"  # ui-ux-pro-max font pairings + palettes
 TMP = Path(__file__).parent.parent / ".tmp"
 TMP.mkdir(exist_ok=True)
 
@@ -271,15 +271,43 @@ def pick_design_direction(analysis: dict) -> tuple[str, str]:
     return key, _ART_DIRECTION_HEADER + "\n" + DESIGN_DIRECTIONS[key]
 
 
+_REFERENCE_INTRO = ("REFERENCE DESIGNS ({n} examples) — THIS IS YOUR QUALITY BAR, not just inspiration. Your output MUST match their level of craft: bold typographic scale and contrast, generous whitespace, visual depth, confident art direction and polish. If your result would look flatter, more generic or more templated than these, it is NOT good enough — raise it to this bar. Match the QUALITY, not the layout: create something NEW that fits THIS business (do NOT copy their layout, colours or content, and do NOT default to a generic tech/SaaS landing page unless the business is actually tech).")
+_CACHE = {"type": "ephemeral"}
+
+
+def _stable_prefix(intro: str, reference_images: list[dict], design_direction: str = "") -> list[dict]:
+    """Prompt-cacheable head of the hero / full-site messages: role + DESIGN_PRINCIPLES
+    (identical for every call), the reference designs (identical for every site of
+    the same industry), then the art direction (one of a handful, picked from
+    industry + tone), each ending in a cache breakpoint. Everything per-site must
+    come AFTER these blocks or the cached prefix stops matching."""
+    blocks = [{"type": "text", "text": f"{intro}\n\n{DESIGN_PRINCIPLES}", "cache_control": _CACHE}]
+    if reference_images:
+        blocks.append({"type": "text", "text": _REFERENCE_INTRO.format(n=len(reference_images))})
+        for ref in reference_images:
+            blocks.append({"type": "image", "source": {"type": "base64", "media_type": ref["media_type"], "data": ref["data"]}})
+        blocks[-1]["cache_control"] = _CACHE
+    if design_direction:
+        blocks.append({"type": "text", "text": design_direction, "cache_control": _CACHE})
+    return blocks
+
+
+def _log_usage(tag: str, usage) -> None:
+    """Per-call token accounting, including prompt-cache reads/writes."""
+    if usage is None:
+        return
+    print(f"[{tag}] tokens: in={usage.input_tokens} out={usage.output_tokens} "
+          f"cache_read={getattr(usage, 'cache_read_input_tokens', 0) or 0} "
+          f"cache_write={getattr(usage, 'cache_creation_input_tokens', 0) or 0}")
+
+
 def extract_brand_colors(html: str) -> list[str]:
     """Deterministically extract the dominant brand colors from a page's CSS, skipping neutrals."""
     import re
     from collections import Counter
 
-    css_blocks = re.findall(r'<style[^>]*>(.*?)</style>', html, re.DOTALL | re.IGNORECASE)
-    css_text = '\n'.join(css_blocks)
-    inline = re.findall(r'style="([^"]*)"', html, re.IGNORECASE)
-    css_text += '\n' + '\n'.join(inline)
+    idx = build_index(html)
+    css_text = '\n'.join(idx.style_blocks) + '\n' + '\n'.join(idx.inline_styles)
 
     def is_neutral(h6: str) -> bool:
         r, g, b = int(h6[0:2],16), int(h6[2:4],16), int(h6[4:6],16)
@@ -320,108 +348,329 @@ def extract_brand_colors(html: str) -> list[str]:
     return result
 
 
-def compress_image(img_path: Path, max_bytes: int = 4_500_000) -> tuple[bytes, str]:
-    """Resize and compress image to stay under max_bytes. Returns (bytes, media_type)."""
+def _transcode_for_inline(data: bytes, max_dim: int, per_img_bytes: int) -> bytes:
+    """Delivery-size copy of an image for data-URI inlining. Transparency (logos)
+    is preserved by keeping PNG; photos are recompressed to JPEG to limit size.
+    Returns the raw bytes unchanged if Pillow is missing or can't decode them."""
+    import image_pool
     try:
-        from PIL import Image
-        import io
-        img = Image.open(img_path).convert("RGB")
-        # Cap dimensions at 2000px max
-        max_dim = 2000
-        if img.width > max_dim or img.height > max_dim:
-            img.thumbnail((max_dim, max_dim), Image.LANCZOS)
-        # Compress until under max_bytes
-        quality = 85
+        return image_pool.transcode(data, max_size=(max_dim, max_dim), fmt="auto", quality=82,
+                                    target_bytes=per_img_bytes, quality_step=12)
+    except Exception:
+        return data
+
+
+_MEDIA_EXT = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp",
+              "image/avif": "avif", "image/svg+xml": "svg"}
+
+
+def fetch_delivery_images(html: str, timeout: int = 8, max_images: int = 14,
+                          max_dim: int = 1600, per_img_bytes: int = 350_000,
+                          workers: int = 8) -> dict:
+    """Fetch + transcode every remote image the page references (both <img src>
+    and CSS url(...)) concurrently through the shared image store.
+    Returns {url: (bytes, media_type, original_len)} for the first `max_images`
+    usable images in document order. Images that fail are simply absent.
+    URLs are fetched in document order, never more at once than are still needed,
+    so nothing past the first `max_images` successes is downloaded."""
+    import re as _re
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    urls = []                      # document order, de-duplicated
+    for m in _re.finditer(r'src=["\'](https?://[^"\']+)["\']', html, _re.I):
+        urls.append(m.group(1))
+    for m in _re.finditer(r'url\((["\']?)(https?://[^)"\']+)\1\)', html, _re.I):
+        urls.append(m.group(2))
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    import image_store
+    variant_key = f"inline{max_dim}q{per_img_bytes}"
+
+    def _build(data: bytes) -> bytes | None:
+        out = _transcode_for_inline(data, max_dim, per_img_bytes)
+        return out if len(out) <= 1_500_000 else None   # skip oversized to avoid bloating the file
+
+    def _one(url):
+        try:
+            hit = image_store.variant(url, variant_key, _build, timeout=timeout)
+            if not hit:
+                return None
+            return hit[0], hit[1], image_store.original_size(url)
+        except Exception:
+            return None
+
+    images = {}
+    todo = iter(urls)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        in_flight = deque()                          # (url, future), document order
         while True:
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=quality)
-            if buf.tell() <= max_bytes or quality <= 40:
+            while len(in_flight) < min(workers, max_images - len(images)):
+                url = next(todo, None)
+                if url is None:
+                    break
+                in_flight.append((url, ex.submit(_one, url)))
+            if not in_flight:
                 break
-            quality -= 15
-        return buf.getvalue(), "image/jpeg"
-    except ImportError:
-        # No Pillow — just read raw and skip if too large
-        raw = img_path.read_bytes()
-        if len(raw) > max_bytes:
-            return None, None
-        media_type = "image/png" if img_path.suffix == ".png" else "image/jpeg"
-        return raw, media_type
+            url, fut = in_flight.popleft()
+            hit = fut.result()
+            if hit is not None:
+                images[url] = hit
+    print(f"[images] {len(images)}/{len(urls)} remote image(s) ready for delivery")
+    return images
+
+
+def rewrite_image_urls(html: str, replacements: dict) -> str:
+    """Replace every occurrence of each URL in `replacements` in ONE pass over the
+    document (instead of one full-copy str.replace per image). Returns the HTML
+    unchanged if anything goes wrong."""
+    if not replacements:
+        return html
+    import re as _re
+    try:
+        # Longest first so a URL that is a prefix of another never wins the match
+        pattern = _re.compile("|".join(_re.escape(u) for u in sorted(replacements, key=len, reverse=True)))
+        return pattern.sub(lambda m: replacements[m.group(0)], html)
+    except Exception as e:
+        print(f"[images] Rewrite failed ({e}) — keeping remote URLs")
+        return html
+
+
+def data_uri_map(images: dict) -> dict:
+    """{url: data URI} for the output of fetch_delivery_images."""
+    import base64 as _b64
+    return {url: f"data:{media};base64,{_b64.b64encode(data).decode()}"
+            for url, (data, media, _) in images.items()}
+
+
+def asset_bundle(images: dict, asset_dir: str = "assets") -> tuple[dict, dict]:
+    """Real files for the output of fetch_delivery_images.
+    Returns ({url: relative path}, {path: bytes}) — files are named by content hash,
+    so the same image referenced under several URLs is shipped once."""
+    import hashlib
+    paths, files = {}, {}
+    for url, (data, media, _) in images.items():
+        name = f"{asset_dir}/{hashlib.sha256(data).hexdigest()[:16]}.{_MEDIA_EXT.get(media, 'img')}"
+        paths[url] = name
+        files[name] = data
+    return paths, files
+
+
+RESPONSIVE_WIDTHS = (480, 960, 1600)
+RESPONSIVE_AVIF   = os.environ.get("RESPONSIVE_AVIF", "false").lower() == "true"   # slow to encode
+
+
+def responsive_bundle(images: dict, asset_dir: str = "assets", widths: tuple = RESPONSIVE_WIDTHS,
+                      workers: int = 8) -> tuple[dict, dict, dict]:
+    """asset_bundle() plus WebP (and optionally AVIF) copies of every image at each
+    of `widths` that is smaller than the delivery image, for <picture>/srcset.
+    Returns (paths, files, pictures) — pictures is {url: {"width", "height",
+    "sources": [(mime, srcset), ...]}}, best format first. Variants are built from
+    the original bytes through the shared image store, so each one is encoded once."""
+    import hashlib
+    import image_pool
+    import image_store
+    from image_probe import probe_dimensions
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths, files = asset_bundle(images, asset_dir)
+    formats = (("AVIF", "image/avif"), ("WEBP", "image/webp")) if RESPONSIVE_AVIF else (("WEBP", "image/webp"),)
+
+    jobs, dims = [], {}
+    for url, (data, media, _) in images.items():
+        if media not in ("image/jpeg", "image/png"):
+            continue                      # gif/svg/webp pass through unchanged
+        wh = probe_dimensions(data)
+        if not wh:
+            continue
+        dims[url] = wh
+        for w in sorted({w for w in widths if w < wh[0]} | {wh[0]}):
+            for fmt, mime in formats:
+                jobs.append((url, w, fmt, mime))
+
+    def _one(job):
+        url, w, fmt, _ = job
+        box = (w, -(-w * dims[url][1] // dims[url][0]))      # width-bound box → exact JPEG draft scale
+        build = lambda data: image_pool.transcode(data, max_size=box, fmt=fmt,
+                                                  quality=60 if fmt == "AVIF" else 78)
+        try:
+            hit = image_store.variant(url, f"w{w}.{fmt.lower()}", build)
+            return hit[0] if hit else None
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        built = list(ex.map(_one, jobs))
+
+    srcsets: dict = {}
+    for (url, w, fmt, mime), data in zip(jobs, built):
+        if not data or len(data) >= len(images[url][0]):
+            continue                      # never ship a "modern" copy heavier than the fallback
+        name = f"{asset_dir}/{hashlib.sha256(data).hexdigest()[:16]}.{fmt.lower()}"
+        files[name] = data
+        srcsets.setdefault(url, {}).setdefault(mime, []).append(f"{name} {w}w")
+
+    pictures = {}
+    for url, by_mime in srcsets.items():
+        pictures[url] = {
+            "width": dims[url][0], "height": dims[url][1],
+            "sources": [(mime, ", ".join(by_mime[mime])) for _, mime in formats if mime in by_mime],
+        }
+    print(f"[images] {len(jobs)} responsive variant(s) for {len(pictures)} image(s)")
+    return paths, files, pictures
+
+
+def _pixel_attr(tag: str, name: str) -> int | None:
+    """Value of a width/height attribute when it is a plain pixel count ("640"),
+    else None — "100%", "50vw" or "auto" are layout hints, not image dimensions."""
+    import re as _re
+    m = _re.search(rf'\s{name}\s*=\s*(["\']?)\s*(\d+)\s*\1(?=[\s/>])', tag, _re.I)
+    return int(m.group(2)) if m else None
+
+
+def picture_rewrite(html: str, pictures: dict, paths: dict) -> str:
+    """Wrap every <img> whose src has responsive variants in a <picture> with one
+    <source srcset sizes> per modern format, then point all remaining references
+    (img src fallback, CSS url(...)) at the asset files. <img> tags that already
+    carry a srcset, or sit inside an authored <picture>, are left to the author."""
+    import re as _re
+
+    def _sub(m):
+        tag = m.group(0)
+        if tag[:8].lower() == "<picture":
+            return tag
+        src = _re.search(r'\ssrc=["\'](https?://[^"\']+)["\']', tag, _re.I)
+        pic = pictures.get(src.group(1)) if src else None
+        if not pic or _re.search(r'\ssrcset=', tag, _re.I):
+            return tag
+        w_px = _pixel_attr(tag, "width")
+        sizes = f"(max-width: {w_px}px) 100vw, {w_px}px" if w_px else "100vw"
+        sources = "".join(f'<source type="{mime}" srcset="{srcset}" sizes="{sizes}">'
+                          for mime, srcset in pic["sources"])
+        return f"<picture>{sources}{tag}</picture>"
+
+    if pictures:
+        html = _re.sub(r"<picture\b.*?</picture\s*>|<img\b[^>]*>", _sub, html, flags=_re.I | _re.S)
+    return rewrite_image_urls(html, paths)
+
+
+def image_placeholders(images: dict, workers: int = 8) -> dict:
+    """{url: data URI} of a 16px JPEG per delivery image — a low-quality image
+    placeholder (LQIP) the browser upscales into a blur while the real file loads.
+    Computed once per image through the shared image store (~300 bytes each)."""
+    import base64 as _b64
+    import image_pool
+    import image_store
+    from concurrent.futures import ThreadPoolExecutor
+
+    build = lambda data: image_pool.transcode(data, max_size=(16, 16), fmt="JPEG", quality=40)
+
+    def _one(url):
+        try:
+            hit = image_store.variant(url, "lqip16", build)
+            return f"data:image/jpeg;base64,{_b64.b64encode(hit[0]).decode()}" if hit else None
+        except Exception:
+            return None
+
+    # Opaque images only — a placeholder would show through a transparent logo forever
+    urls = [u for u, (_, media, _) in images.items() if media == "image/jpeg"]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        return {u: uri for u, uri in zip(urls, ex.map(_one, urls)) if uri}
+
+
+def stamp_image_attrs(html: str, images: dict, placeholders: dict | None = None) -> str:
+    """Deterministic <img> post-processor — no LLM involved:
+      • width/height from the delivery image (only if missing; a lone pixel width or
+        height gets its aspect-matched partner, a "100%"/"50vw" one gets nothing)
+        so the browser reserves the box → zero layout shift
+      • loading="lazy" on everything except the hero image(s) — those before
+        <!-- HERO_END -->, or the first <img> on pages without the marker
+      • decoding="async" everywhere
+      • the LQIP from image_placeholders() as a cover background, so the box shows a
+        blurred preview until the real image arrives
+    Existing attributes are never overwritten. Keys of `images`/`placeholders` are
+    the remote URLs, so run this before the URLs are rewritten."""
+    import re as _re
+    from image_probe import probe_dimensions
+
+    placeholders = placeholders or {}
+    dims = {}
+    for url, (data, _, _) in images.items():
+        wh = probe_dimensions(data)
+        if wh:
+            dims[url] = wh
+    hero_end = html.find("<!-- HERO_END -->")
+    seen = [0]
+
+    def _has(tag, attr):
+        return _re.search(rf"\s{attr}\s*=", tag, _re.I) is not None
+
+    def _sub(m):
+        tag = m.group(0)
+        is_hero = m.start() < hero_end if hero_end != -1 else seen[0] == 0
+        seen[0] += 1
+        src = _re.search(r'\ssrc=["\']([^"\']+)["\']', tag, _re.I)
+        url = src.group(1) if src else ""
+        add = []
+        if url in dims:
+            w, h = dims[url]
+            has_w, has_h = _has(tag, "width"), _has(tag, "height")
+            if not has_w and not has_h:
+                add.append(f'width="{w}" height="{h}"')
+            elif not has_h and _pixel_attr(tag, "width"):
+                add.append(f'height="{round(_pixel_attr(tag, "width") * h / w)}"')
+            elif not has_w and _pixel_attr(tag, "height"):
+                add.append(f'width="{round(_pixel_attr(tag, "height") * w / h)}"')
+        if not is_hero and not _has(tag, "loading"):
+            add.append('loading="lazy"')
+        if not _has(tag, "decoding"):
+            add.append('decoding="async"')
+        if url in placeholders:
+            bg = f"background-size:cover;background-image:url({placeholders[url]})"
+            style = _re.search(r'\sstyle=(["\'])(.*?)\1', tag, _re.I | _re.S)
+            if style:
+                merged = style.group(2).rstrip().rstrip(";")
+                merged = f"{merged};{bg}" if merged else bg
+                tag = tag[:style.start(2)] + merged + tag[style.end(2):]
+            else:
+                add.append(f'style="{bg}"')
+        if not add:
+            return tag
+        close = "/>" if tag.endswith("/>") else ">"
+        return f"{tag[:-len(close)].rstrip()} {' '.join(add)}{close}"
+
+    return _re.sub(r"<img\b[^>]*>", _sub, html, flags=_re.I)
 
 
 def inline_remote_images(html: str, timeout: int = 8, max_images: int = 14,
-                         max_dim: int = 1600, per_img_bytes: int = 350_000) -> str:
+                         max_dim: int = 1600, per_img_bytes: int = 350_000,
+                         workers: int = 8) -> str:
     """Make the page self-contained: download every remote image it references
     (both <img src> and CSS url(...)) and embed it as a base64 data URI, so the
     HTML no longer hot-links to the original site's server.
 
+    Images are fetched and transcoded concurrently (`workers`, through the shared
+    image store), then the page is rewritten in ONE pass from a URL → data-URI map,
+    instead of one full-document str.replace per image.
+
     Fail-safe by design: any image that can't be fetched/encoded keeps its original
     URL, and any unexpected error returns the HTML unchanged. Transparency (logos)
     is preserved by keeping PNG; photos are recompressed to JPEG to limit size.
     """
-    import re as _re, io as _io, base64 as _b64
-    try:
-        import requests as _rq
-    except Exception:
+    import time as _time
+    t0 = _time.monotonic()
+    images = fetch_delivery_images(html, timeout, max_images, max_dim, per_img_bytes, workers)
+    if not images:
         return html
+    html = rewrite_image_urls(html, data_uri_map(images))
 
-    urls = set()
-    for m in _re.finditer(r'src=["\'](https?://[^"\']+)["\']', html, _re.I):
-        urls.add(m.group(1))
-    for m in _re.finditer(r'url\((["\']?)(https?://[^)"\']+)\1\)', html, _re.I):
-        urls.add(m.group(2))
-    if not urls:
-        return html
-
-    try:
-        from PIL import Image
-        have_pil = True
-    except Exception:
-        have_pil = False
-
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                             "AppleWebKit/537.36 (KHTML, like Gecko) "
-                             "Chrome/120.0.0.0 Safari/537.36"}
-    replaced = 0
-    for url in list(urls):
-        if replaced >= max_images:
-            break
-        try:
-            r = _rq.get(url, headers=headers, timeout=timeout)
-            if not r.ok or not r.content:
-                continue
-            data, media = r.content, "image/jpeg"
-            if have_pil:
-                try:
-                    img = Image.open(_io.BytesIO(data))
-                    has_alpha = img.mode in ("RGBA", "LA") or (
-                        img.mode == "P" and "transparency" in img.info)
-                    if max(img.size) > max_dim:
-                        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
-                    buf = _io.BytesIO()
-                    if has_alpha:
-                        img.convert("RGBA").save(buf, format="PNG", optimize=True)
-                        media = "image/png"
-                    else:
-                        rgb, q = img.convert("RGB"), 82
-                        while True:
-                            buf = _io.BytesIO()
-                            rgb.save(buf, format="JPEG", quality=q)
-                            if buf.tell() <= per_img_bytes or q <= 40:
-                                break
-                            q -= 12
-                        media = "image/jpeg"
-                    data = buf.getvalue()
-                except Exception:
-                    pass  # keep raw bytes + default media type
-            if len(data) > 1_500_000:   # skip oversized to avoid bloating the file
-                continue
-            data_uri = f"data:{media};base64,{_b64.b64encode(data).decode()}"
-            html = html.replace(url, data_uri)
-            replaced += 1
-        except Exception:
-            continue
-
-    print(f"[inline] Embedded {replaced}/{len(urls)} image(s) as data URIs")
+    orig_bytes = sum(orig for _, _, orig in images.values())
+    new_bytes = sum(len(data) for data, _, _ in images.values())
+    print(f"[inline] Embedded {len(images)} image(s) as data URIs — "
+          f"{orig_bytes // 1024}KB originals → {new_bytes // 1024}KB embedded "
+          f"(saved {(orig_bytes - new_bytes) // 1024}KB) in {_time.monotonic() - t0:.1f}s")
     return html
 
 
@@ -430,78 +679,34 @@ def load_reference_images(n: int = 4, industry: str = "") -> list[dict]:
     Pick n reference design screenshots matched to the industry.
     Uses reference_designs/index.json to select industry-appropriate designs.
     Falls back to generic designs if not enough industry matches exist.
+    Payloads come pre-encoded from the memory-mapped reference cache
+    (reference_cache.py) — nothing is decoded or recompressed per request.
     """
-    index_path = REFERENCE_DIR / "index.json"
-    chosen_names = []
+    import reference_cache
+    cache = reference_cache.get()
+    if cache is None:
+        return []
 
-    if index_path.exists() and industry:
-        try:
-            index = json.loads(index_path.read_text(encoding="utf-8"))
-            industry_map = index.get("industry_map", {})
-
-            # Find best matching industry key
-            ind_lower = industry.lower()
-            matched_key = None
-            priority = [
-                "food", "restaurant", "cafe", "bakery", "catering",
-                "tech", "saas", "finance", "legal", "consulting",
-                "real_estate", "luxury", "architecture",
-                # specific trades before the generic "handwerk" fallback
-                "maler", "schreiner", "garten", "dach", "elektr", "sanitaer", "bau",
-                "handwerk",
-                "health", "wellness", "medical", "dental", "beauty", "product",
-            ]
-            for key in priority:
-                if key in ind_lower:
-                    matched_key = key
-                    break
-
-            if matched_key and matched_key in industry_map:
-                ordered = industry_map[matched_key]         # priority-ordered file stems
-                generic  = industry_map.get("generic", [])
-
-                # Build candidate list: industry-specific first, then generic fill
-                candidates = []
-                seen = set()
-                for stem in ordered + generic:
-                    if stem not in seen:
-                        seen.add(stem)
-                        candidates.append(stem)
-
-                chosen_names = candidates[:n]
-                print(f"[refs] Industry '{matched_key}' → using designs: {chosen_names}")
-        except Exception as e:
-            print(f"[refs] index.json error ({e}) — falling back to random")
-
-    # Build Path objects from chosen stems
-    chosen_paths = []
-    if chosen_names:
-        for stem in chosen_names:
-            p = REFERENCE_DIR / f"{stem}.png"
-            if not p.exists():
-                p = REFERENCE_DIR / f"{stem}.jpg"
-            if p.exists():
-                chosen_paths.append(p)
-
-    # Fallback: random selection from all available images
-    if len(chosen_paths) < n:
-        all_images = [
-            img for img in (list(REFERENCE_DIR.glob("*.png")) + list(REFERENCE_DIR.glob("*.jpg")))
-            if img.stat().st_size < 800_000 and img not in chosen_paths
-        ]
-        random.shuffle(all_images)
-        chosen_paths += all_images[: n - len(chosen_paths)]
+    chosen = []
+    matched_key = reference_cache.match_industry(industry) if industry else None
+    if matched_key and matched_key in cache.candidates:
+        chosen = cache.candidates[matched_key][:n]
+        print(f"[refs] Industry '{matched_key}' → using designs: {chosen}")
+
+    # Fallback: fill up from all available images — in a fixed order per industry, so
+    # the same industry always sends the same references and the cached prompt prefix
+    # (see _stable_prefix) keeps matching
+    if len(chosen) < n:
+        rest = [stem for stem, e in cache.entries.items()
+                if e["src_size"] < 800_000 and stem not in chosen]
+        rest.sort(key=lambda stem: hashlib.sha256(f"{industry}|{stem}".encode()).hexdigest())
+        chosen += rest[: n - len(chosen)]
 
     result = []
-    for img_path in chosen_paths:
-        raw, media_type = compress_image(img_path)
-        if raw is None:
-            print(f"[refs] Skipping {img_path.name} (too large, install Pillow to compress)")
-            continue
-        data = base64.standard_b64encode(raw).decode("utf-8")
-        size_kb = len(raw) // 1024
-        result.append({"path": str(img_path), "data": data, "media_type": media_type})
-        print(f"[refs] Using reference: {img_path.name} ({size_kb}KB)")
+    for stem in chosen:
+        ref = cache.payload(stem)
+        result.append(ref)
+        print(f"[refs] Using reference: {cache.entries[stem]['file']} ({cache.entries[stem]['kb']}KB)")
     return result
 
 
@@ -509,14 +714,10 @@ def load_motifs(industry: str = "", n: int = 3) -> list[str]:
     """Return up to n inline SVG motif strings (Phosphor filled icons) matched to the
     industry. They use fill=currentColor, so they recolor via the CSS `color`
     property. Used only as an optional, subtle hero accent (graphic/typographic mode)."""
-    import re
-    idx = MOTIF_DIR / "index.json"
-    if not idx.exists() or not industry:
-        return []
-    try:
-        imap = json.loads(idx.read_text(encoding="utf-8")).get("industry_map", {})
-    except Exception as e:
-        print(f"[motifs] index.json error ({e})")
+    from asset_registry import get_registry
+    reg = get_registry()
+    imap = reg.motif_map
+    if not imap or not industry:
         return []
     ind = industry.lower()
     priority = [
@@ -530,12 +731,7 @@ def load_motifs(industry: str = "", n: int = 3) -> list[str]:
     names = imap.get(key, []) if key else []
     if not names:
         names = imap.get("generic", [])
-    svgs = []
-    for nm in names[:n]:
-        p = MOTIF_DIR / f"{nm}.svg"
-        if p.exists():
-            svg = re.sub(r"<!--.*?-->", "", p.read_text(encoding="utf-8"), flags=re.DOTALL).strip()
-            svgs.append(svg)
+    svgs = [svg for svg in (reg.motif_svg(nm) for nm in names[:n]) if svg]
     if svgs:
         print(f"[motifs] Industry '{key or 'generic'}' → {names[:n]}")
     return svgs
@@ -546,14 +742,11 @@ def load_illustration_svg(industry: str = "") -> str | None:
     The unDraw accent purple is swapped to var(--clr-primary) so the artwork takes the
     client's brand color, and the root <svg> is made responsive. Injected into a
     <div class="hero-art"></div> placeholder AFTER generation (never sent to the model)."""
-    import re, random
-    idx = ILLUS_DIR / "index.json"
-    if not idx.exists() or not industry:
-        return None
-    try:
-        imap = json.loads(idx.read_text(encoding="utf-8")).get("industry_map", {})
-    except Exception as e:
-        print(f"[illus] index.json error ({e})")
+    import random
+    from asset_registry import get_registry
+    reg = get_registry()
+    imap = reg.illus_map
+    if not imap or not industry:
         return None
     ind = industry.lower()
     priority = [
@@ -568,20 +761,12 @@ def load_illustration_svg(industry: str = "") -> str | None:
     files = imap.get(key, [])
     if not files:
         return None
-    p = ILLUS_DIR / random.choice(files)
-    if not p.exists():
+    fname = random.choice(files)
+    svg = reg.illustration_svg(fname)          # pre-cleaned, recoloured, responsive
+    if not svg:
         return None
-    svg = p.read_text(encoding="utf-8")
-    svg = re.sub(r"<\?xml.*?\?>", "", svg, flags=re.DOTALL)
-    svg = re.sub(r"<!--.*?-->", "", svg, flags=re.DOTALL)
-    for accent in ("#6c63ff", "#6C63FF", "#7f77ff", "#7F77FF"):
-        svg = svg.replace(accent, "var(--clr-primary,#6c63ff)")
-    # make the root <svg> scale to its container (drop fixed width/height, add style)
-    svg = re.sub(r'(<svg\b[^>]*?)\s+width="[^"]*"', r"\1", svg, count=1)
-    svg = re.sub(r'(<svg\b[^>]*?)\s+height="[^"]*"', r"\1", svg, count=1)
-    svg = re.sub(r"<svg\b", '<svg style="width:100%;height:auto;display:block;max-height:78vh" ', svg, count=1)
-    print(f"[illus] Industry '{key or 'generic'}' → {p.name}")
-    return svg.strip()
+    print(f"[illus] Industry '{key or 'generic'}' → {fname}")
+    return svg
 
 
 # ── ui-ux-pro-max font pairings + colour palettes ─────────────────────────────
@@ -660,34 +845,16 @@ def _ux_industry_key(industry: str) -> str:
     return "generic"
 
 
-def _read_ux_csv(fname: str) -> list:
-    import csv
-    p = UX_DATA_DIR / fname
-    if not p.exists():
-        return []
-    try:
-        with open(p, encoding="utf-8") as f:
-            return list(csv.DictReader(f))
-    except Exception as e:
-        print(f"[ux] {fname} read error ({e})")
-        return []
-
-
 def pick_font_pairing(industry: str = "", tone: str = "") -> dict | None:
     """Pick a Google-font heading/body pairing from the ui-ux-pro-max typography data,
     matched to the industry + tone. Returns {heading, body, css, name} or None."""
     import re
-    rows = _read_ux_csv("typography.csv")
-    if not rows:
-        return None
+    from asset_registry import get_registry
     query = (_FONT_QUERY.get(_ux_industry_key(industry), "") + " " + (tone or "")).lower()
     qwords = [w for w in re.findall(r"[a-z]+", query) if len(w) > 3]
-    best, best_score = rows[0], -1
-    for r in rows:
-        hay = (r.get("Best For", "") + " " + r.get("Mood/Style Keywords", "") + " " + r.get("Category", "")).lower()
-        s = sum(1 for w in qwords if w in hay)
-        if s > best_score:
-            best, best_score = r, s
+    best = get_registry().font_pairing(qwords)
+    if best is None:
+        return None
     print(f"[ux] Font pairing → {best.get('Font Pairing Name')}")
     return {"heading": best.get("Heading Font", ""), "body": best.get("Body Font", ""),
             "css": best.get("CSS Import", ""), "name": best.get("Font Pairing Name", "")}
@@ -696,41 +863,33 @@ def pick_font_pairing(industry: str = "", tone: str = "") -> dict | None:
 def pick_palette(industry: str = "") -> dict | None:
     """Pick an industry-fitting, WCAG-safe colour palette from the ui-ux-pro-max colours
     data. Used ONLY as a fallback when the real brand colours are unusable."""
-    rows = _read_ux_csv("colors.csv")
-    if not rows:
-        return None
-    want = _PALETTE_TYPE.get(_ux_industry_key(industry), "B2B Service").strip().lower()
-    for r in rows:
-        if r.get("Product Type", "").strip().lower() == want:
-            print(f"[ux] Palette → {r.get('Product Type')}")
-            return r
-    return None
+    from asset_registry import get_registry
+    want = _PALETTE_TYPE.get(_ux_industry_key(industry), "B2B Service")
+    r = get_registry().palette(want)
+    if r is not None:
+        print(f"[ux] Palette → {r.get('Product Type')}")
+    return r
 
 
-def extract_logo_url(html: str, base_url: str = "") -> str | None:
+def extract_logo_url(html: str, base_url: str = "", index: PageIndex | None = None) -> str | None:
     """Find the most likely logo image URL from a page's HTML."""
-    import re
     from urllib.parse import urljoin
 
+    idx = index or build_index(html)
+
     # 1. <img> tags with logo in class, id, alt, or src
-    for m in re.finditer(r'<img[^>]+>', html, re.IGNORECASE):
-        tag = m.group(0)
-        attrs = tag.lower()
-        src_m = re.search(r'src=["\']([^"\']+)["\']', tag, re.IGNORECASE)
-        if not src_m:
-            continue
-        src = src_m.group(1).strip()
+    for img in idx.images:
+        attrs = img["tag"].lower()
+        src = img["src"]
         if any(k in attrs for k in ('logo', 'brand', 'site-logo', 'site_logo')):
             if not any(x in src.lower() for x in ('sprite', 'pixel', 'tracking', '1x1')):
                 return urljoin(base_url, src) if base_url else src
 
     # 2. <img> inside <header> or <nav>
-    header_m = re.search(r'<(?:header|nav)[^>]*>(.*?)</(?:header|nav)>', html, re.DOTALL | re.IGNORECASE)
-    if header_m:
-        for m in re.finditer(r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>', header_m.group(1), re.IGNORECASE):
-            src = m.group(1).strip()
-            if not any(x in src.lower() for x in ('sprite', 'pixel', 'tracking', '1x1', 'icon')):
-                return urljoin(base_url, src) if base_url else src
+    for img in idx.header_images():
+        src = img["src"]
+        if not any(x in src.lower() for x in ('sprite', 'pixel', 'tracking', '1x1', 'icon')):
+            return urljoin(base_url, src) if base_url else src
 
     return None
 
@@ -743,38 +902,30 @@ def truncate_html(html: str, max_chars: int = 40000) -> str:
     return html[:max_chars] + "\n<!-- truncated -->"
 
 
-def extract_text_content(html: str, max_chars: int = 12000) -> str:
+def extract_text_content(html: str, max_chars: int = 12000, index: PageIndex | None = None) -> str:
     """Strip HTML tags and extract clean readable text from the page."""
-    import re
-    # Remove script, style, nav, footer blocks
-    html = re.sub(r'<(script|style|noscript)[^>]*>.*?</\1>', ' ', html, flags=re.DOTALL | re.IGNORECASE)
-    # Remove all HTML tags
-    text = re.sub(r'<[^>]+>', ' ', html)
-    # Decode common HTML entities
-    text = text.replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>') \
-               .replace('&nbsp;', ' ').replace('&#39;', "'").replace('&quot;', '"')
-    # Collapse whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    # Visible text only (script/style/noscript dropped, entities decoded, whitespace collapsed)
+    text = (index or build_index(html)).text.replace('\xa0', ' ')
     if len(text) > max_chars:
         text = text[:max_chars] + '...'
     return text
 
 
-def extract_image_urls(html: str, base_url: str, max_images: int = 12) -> list[str]:
+def extract_image_urls(html: str, base_url: str, max_images: int = 12,
+                       index: PageIndex | None = None) -> list[str]:
     """Extract content image URLs from HTML, resolved to absolute URLs."""
     from urllib.parse import urljoin, urlparse
-    import re
 
+    idx = index or build_index(html)
     # Find all src attributes in img tags
-    raw_urls = re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', html, re.IGNORECASE)
+    raw_urls = [img["src"] for img in idx.images]
     # Also pick up lazy-loaded images (data-src, data-lazy-src, data-original, etc.)
-    raw_urls += re.findall(r'data-(?:src|lazy-src|original|lazy|bg)=["\']([^"\']+)["\']', html, re.IGNORECASE)
+    raw_urls += idx.lazy_urls
     # CSS background-image (inline styles and <style> blocks) — often contains hero images
-    raw_urls += re.findall(r'background(?:-image)?\s*:\s*url\(["\']?([^)"\']+)["\']?\)', html, re.IGNORECASE)
+    raw_urls += idx.background_urls()
 
     # Also find srcset
-    srcsets = re.findall(r'srcset=["\']([^"\']+)["\']', html, re.IGNORECASE)
-    for srcset in srcsets:
+    for srcset in idx.srcsets:
         for part in srcset.split(","):
             url = part.strip().split(" ")[0]
             if url:
@@ -811,35 +962,18 @@ def extract_image_urls(html: str, base_url: str, max_images: int = 12) -> list[s
 
 def validate_image_urls(urls: list[str], min_dim: int = 350, timeout: int = 4) -> list[str]:
     """
-    Filter image URLs by actual downloaded dimensions.
-    Reads only the first 64 KB of each image (enough for PNG/JPEG header).
+    Filter image URLs by their real pixel dimensions.
+    Only the image header is fetched (HTTP Range, first 4 KB — see image_probe.py),
+    and dimensions are cached per URL, so repeat candidates cost nothing.
     Runs all requests in parallel — total wait time = ~timeout seconds.
     Images that can't be checked are kept (safe fallback).
     """
-    import requests as _req
-    import io as _io
     from concurrent.futures import ThreadPoolExecutor, as_completed
-
-    HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+    from image_probe import probe_url
 
     def _check(url):
-        try:
-            resp = _req.get(url, headers=HEADERS, timeout=timeout, stream=True)
-            if resp.status_code != 200:
-                return url, None, None
-            buf = b""
-            for chunk in resp.iter_content(8192):
-                buf += chunk
-                if len(buf) >= 65536:
-                    break
-            try:
-                from PIL import Image as _Img
-                img = _Img.open(_io.BytesIO(buf))
-                return url, img.width, img.height
-            except Exception:
-                return url, None, None
-        except Exception:
-            return url, None, None
+        dims = probe_url(url, timeout=timeout)
+        return (url, *dims) if dims else (url, None, None)
 
     scored = []
     with ThreadPoolExecutor(max_workers=8) as ex:
@@ -863,34 +997,117 @@ def validate_image_urls(urls: list[str], min_dim: int = 350, timeout: int = 4) -
     return result
 
 
-def download_site_images_for_claude(urls: list[str], max_images: int = 6, timeout: int = 6) -> list[dict]:
+def _thumbnail_for_claude(data: bytes) -> bytes | None:
+    """800px / 70% JPEG copy for the model, or None if the image is under 350px."""
+    import image_pool
+    return image_pool.transcode(data, min_side=350, max_size=(800, 800), fmt="JPEG", quality=70)
+
+
+_DHASHES: dict = {}         # sha256(thumbnail) → dhash, per process
+_DHASHES_MAX = 2048
+_DHASHES_LOCK = threading.Lock()
+_DUP_DISTANCE = 6           # dHash bits (of 64) within which two images are "the same photo"
+
+
+def _image_fingerprint(url: str, thumb: bytes) -> tuple[int, int]:
+    """(perceptual hash of the thumbnail, pixel count of the original at url).
+    The hash is cached by thumbnail content; the pixel count is per URL — two
+    resolutions of one photo can shrink to identical thumbnails — and comes from
+    the dimensions the image store recorded, or a header-only probe, never from
+    reading (or re-downloading) the original."""
+    import image_pool
+    import image_store
+    from image_probe import probe_url
+
+    key = hashlib.sha256(thumb).hexdigest()
+    with _DHASHES_LOCK:
+        dh = _DHASHES.get(key)
+    if dh is None:
+        dh = image_pool.dhash(thumb)
+        with _DHASHES_LOCK:
+            if len(_DHASHES) >= _DHASHES_MAX:
+                _DHASHES.pop(next(iter(_DHASHES)))
+            _DHASHES[key] = dh
+    w, h = image_store.original_dims(url) or probe_url(url) or (0, 0)
+    return dh, w * h
+
+
+def _collapse_near_duplicates(items: list) -> list[dict]:
+    """items: [(url, thumb, (dhash, pixels))] in priority order. The same photo
+    scraped as src / srcset / data-src / CSS background at different sizes is one
+    cluster; each cluster keeps its first (priority) position but is represented by
+    its highest-resolution URL."""
+    import image_pool
+    clusters = []
+    for url, thumb, (dh, px) in items:
+        for c in clusters:
+            if image_pool.hamming(c["dhash"], dh) <= _DUP_DISTANCE:
+                c["dups"] += 1
+                if px > c["pixels"]:
+                    c.update(url=url, thumb=thumb, pixels=px)
+                break
+        else:
+            clusters.append({"url": url, "thumb": thumb, "dhash": dh, "pixels": px, "dups": 0})
+    return clusters
+
+
+def download_site_images_for_claude(urls: list[str], max_images: int = 6, timeout: int = 6,
+                                    workers: int = 6) -> list[dict]:
     """
     Download site images and encode as base64 so Claude can SEE them and pick the best one.
     Compresses each to max 800px / 70% JPEG quality to stay token-efficient.
     Returns list of {url, data, media_type}.
+
+    Downloads run on a bounded pool (`workers`) and each image is transcoded as soon
+    as its bytes arrive. Near-duplicates (same photo at another resolution/URL, by
+    perceptual hash) collapse into one slot, represented by the highest-resolution
+    URL. The result is the first `max_images` distinct images in the priority order
+    of `urls` — as soon as that prefix is settled the remaining downloads are cancelled.
     """
-    import requests as _req, io as _io
+    import image_store
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    def _one(url):
+        hit = image_store.variant(url, "claude800", _thumbnail_for_claude, timeout=timeout)
+        if not hit:
+            return None
+        return hit[0], _image_fingerprint(url, hit[0])
+
+    def _settled() -> list:
+        items = []
+        for i, url in enumerate(urls):
+            if i not in done_at:
+                break
+            if done_at[i] is not None:
+                items.append((url, *done_at[i]))
+        return items
 
+    done_at: dict = {}          # index in urls → (jpeg bytes, fingerprint) | None
+    ex = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        pending = {ex.submit(_one, u): i for i, u in enumerate(urls)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in finished:
+                i = pending.pop(f)
+                try:
+                    done_at[i] = f.result()
+                except Exception as e:
+                    done_at[i] = None
+                    print(f"[img-dl] ✗ {urls[i].split('/')[-1][:40]} — {e}")
+            # Stop once the first max_images distinct images (in priority order) are known
+            if len(_collapse_near_duplicates(_settled())) >= max_images:
+                pending = {}
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)   # stragglers still land in the image store
+
+    done = [(urls[i], *done_at[i]) for i in sorted(done_at) if done_at[i] is not None]
     result = []
-    for url in urls:
-        if len(result) >= max_images:
-            break
-        try:
-            resp = _req.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
-            if resp.status_code != 200:
-                continue
-            from PIL import Image as _Img
-            img = _Img.open(_io.BytesIO(resp.content)).convert("RGB")
-            if img.width < 350 or img.height < 350:
-                continue
-            img.thumbnail((800, 800), _Img.LANCZOS)
-            buf = _io.BytesIO()
-            img.save(buf, format="JPEG", quality=70)
-            data = base64.standard_b64encode(buf.getvalue()).decode()
-            result.append({"url": url, "data": data, "media_type": "image/jpeg"})
-            print(f"[img-dl] ✓ {url.split('/')[-1][:40]} → {len(buf.getvalue())//1024}KB")
-        except Exception as e:
-            print(f"[img-dl] ✗ {url.split('/')[-1][:40]} — {e}")
+    for c in _collapse_near_duplicates(done)[:max_images]:
+        data = base64.standard_b64encode(c["thumb"]).decode()
+        result.append({"url": c["url"], "data": data, "media_type": "image/jpeg"})
+        dup_note = f" (+{c['dups']} near-duplicate(s) collapsed)" if c["dups"] else ""
+        print(f"[img-dl] ✓ {c['url'].split('/')[-1][:40]} → {len(c['thumb'])//1024}KB{dup_note}")
 
     print(f"[img-dl] Downloaded {len(result)} images for Claude visual selection")
     return result
@@ -1212,13 +1429,14 @@ def generate_hero_only(analysis: dict, reference_images: list[dict], site_image_
         "(e.g. #FAF9F6), near-black text (e.g. #1A1A1A), warm grey support tones, and at most ONE restrained accent — "
         "only if the brand suggests one. No orange/yellow/bright colours unless they are the brand's own.")
 
-    msg_content = []
-    if reference_images:
-        msg_content.append({"type": "text", "text": (
-            f"REFERENCE DESIGNS ({len(reference_images)} examples) — THIS IS YOUR QUALITY BAR, not just inspiration. Your output MUST match their level of craft: bold typographic scale and contrast, generous whitespace, visual depth, confident art direction and polish. If your result would look flatter, more generic or more templated than these, it is NOT good enough — raise it to this bar. Match the QUALITY, not the layout: create something NEW that fits THIS business (do NOT copy their layout, colours or content, and do NOT default to a generic tech/SaaS landing page unless the business is actually tech)."
-        )})
-        for ref in reference_images:
-            msg_content.append({"type": "image", "source": {"type": "base64", "media_type": ref["media_type"], "data": ref["data"]}})
+    # Stable, cached prefix first (role + principles + reference designs + art direction), per-site after
+    _dirkey, design_direction = pick_design_direction(analysis)
+    print(f"[design] Hero art direction: {_dirkey}")
+    msg_content = _stable_prefix(
+        "You are an elite web designer. Generate a complete HTML page with ONLY a nav bar and hero section — this must look like it came from a top design studio.",
+        reference_images,
+        design_direction,
+    )
 
     # Original site screenshot — gives Claude the brand identity at a glance
     if screenshot_data:
@@ -1237,13 +1455,7 @@ def generate_hero_only(analysis: dict, reference_images: list[dict], site_image_
             msg_content.append({"type": "text", "text": f"URL: {img_d['url']}"})
             msg_content.append({"type": "image", "source": {"type": "base64", "media_type": img_d["media_type"], "data": img_d["data"]}})
 
-    _dirkey, design_direction = pick_design_direction(analysis)
-    print(f"[design] Hero art direction: {_dirkey}")
-    msg_content.append({"type": "text", "text": f"""You are an elite web designer. Generate a complete HTML page with ONLY a nav bar and hero section — this must look like it came from a top design studio.
-
-{DESIGN_PRINCIPLES}
-
-BUSINESS:
+    msg_content.append({"type": "text", "text": f"""BUSINESS:
 Name:     {business_name}
 Industry: {industry}
 Tone:     {tone}
@@ -1279,7 +1491,7 @@ CONTRAST LAW — most important rule, no exceptions ever:
   • Light background → ALL text color:#111111 — set on EVERY element individually
   • NEVER rely on color inheritance — set color explicitly on h1,h2,p,span,a,button each
 
-{design_direction}
+ART DIRECTION: apply the art direction given above (after the reference designs) — it is mandatory.
 {motifs_block}
 {illus_block}
 
@@ -1308,6 +1520,7 @@ OUTPUT: Complete HTML <!DOCTYPE html> to </html>. Nothing below the hero. No mar
                 messages=[{"role": "user", "content": msg_content}]
             ) as stream:
                 html = stream.get_final_text().strip()
+                _log_usage("hero", stream.get_final_message().usage)
             break
         except anthropic.APIStatusError as e:
             if e.status_code in (529, 500) and attempt < 2:
@@ -1339,13 +1552,12 @@ OUTPUT: Complete HTML <!DOCTYPE html> to </html>. Nothing below the hero. No mar
 
 def fetch_pexels_images(query: str, n: int = 5) -> list[str]:
     """Search Pexels for relevant stock photos. Returns list of image URLs."""
-    import requests as _req
     key = os.environ.get("PEXELS_API_KEY", "")
     if not key:
         print("[pexels] No API key — skipping stock images")
         return []
     try:
-        resp = _req.get(
+        resp = http_client.get(
             "https://api.pexels.com/v1/search",
             headers={"Authorization": key},
             params={"query": query, "per_page": n, "orientation": "landscape"},
@@ -1876,19 +2088,14 @@ def generate_website(analysis: dict, reference_images: list[dict], site_image_ur
     is_tech = any(kw in industry.lower() for kw in tech_keywords)
     is_food = any(kw in industry.lower() for kw in food_keywords)
 
-    # Build message content with reference images
-    content = []
-
-    if reference_images:
-        content.append({
-            "type": "text",
-            "text": f"REFERENCE DESIGNS ({len(reference_images)} examples) — THIS IS YOUR QUALITY BAR, not just inspiration. Your output MUST match their level of craft: bold typographic scale and contrast, generous whitespace, visual depth, confident art direction and polish. If your result would look flatter, more generic or more templated than these, it is NOT good enough — raise it to this bar. Match the QUALITY, not the layout: create something NEW that fits THIS business (do NOT copy their layout, colours or content, and do NOT default to a generic tech/SaaS landing page unless the business is actually tech)."
-        })
-        for ref in reference_images:
-            content.append({
-                "type": "image",
-                "source": {"type": "base64", "media_type": ref["media_type"], "data": ref["data"]}
-            })
+    # Stable, cached prefix first (role + principles + reference designs + art direction), per-site after
+    _dirkey, design_direction = pick_design_direction(analysis)
+    print(f"[design] Full-site art direction: {_dirkey}")
+    content = _stable_prefix(
+        "You are an elite web designer. Study the reference screenshots below carefully — your output must match their quality: typographic scale, whitespace, visual depth, section variety, and overall polish. Build something that looks like it came from a top design studio.",
+        reference_images,
+        design_direction,
+    )
 
     # Original site screenshot — brand identity anchor
     if screenshot_data:
@@ -2172,15 +2379,9 @@ GALLERY / ABOUT: use remaining images with <img> tags (max-width:100%;height:aut
         "only if the brand suggests one. No orange/yellow/bright colours unless they are the brand's own.")
 
     # ── Claude prompt ──────────────────────────────────────────────────────────
-    _dirkey, design_direction = pick_design_direction(analysis)
-    print(f"[design] Full-site art direction: {_dirkey}")
     content.append({
         "type": "text",
-        "text": f"""You are an elite web designer. Study the reference screenshots above carefully — your output must match their quality: typographic scale, whitespace, visual depth, section variety, and overall polish. Build something that looks like it came from a top design studio.
-
-{DESIGN_PRINCIPLES}
-
-CONTENT COMPLETENESS LAW — the most important rule:
+        "text": f"""CONTENT COMPLETENESS LAW — the most important rule:
 Every section must contain ALL the real content from the original website. Never omit services, products, team members, prices, menu items, opening hours, descriptions, or any other information provided in the SECTION CONTENT blocks below. If a service has a description, include it. If a menu has 20 dishes, list all 20. If there are 5 team members, show all 5. Do not summarize, thin out, or replace real content with placeholder text.
 
 ── BUSINESS DATA (never invent — only use what is listed here) ──────────
@@ -2235,7 +2436,7 @@ CONTRAST LAW — most important rule, no exceptions ever:
 BACKGROUND — make it feel like THIS brand, not a default dark gradient:
 {images_block}
 
-{design_direction}
+ART DIRECTION: apply the art direction given above (after the reference designs) — it is mandatory.
 {motifs_block}
 
 HEADLINE: Exact text from data above. Size clamp(2.5rem,6vw,5rem), bold, line-height:1.0–1.1, explicit color.
@@ -2382,6 +2583,7 @@ OUTPUT: One complete HTML file from <!DOCTYPE html> to </html>. No markdown fenc
                 messages=[{"role": "user", "content": content}]
             ) as stream:
                 html = stream.get_final_text().strip()
+                _log_usage("generate", stream.get_final_message().usage)
             break
         except anthropic.APIStatusError as e:
             if e.status_code in (529, 500) and attempt < 2:
@@ -2420,6 +2622,7 @@ def main():
     parser.add_argument("url", help="Customer website URL")
     parser.add_argument("--name", default="", help="Business name (optional override)")
     parser.add_argument("--refs", type=int, default=3, help="Number of reference images to use (default: 3)")
+    parser.add_argument("--pages", type=int, default=4, help="Number of sub-pages to crawl (default: 4, 0 = homepage only)")
     args = parser.parse_args()
 
     url = args.url
@@ -2436,9 +2639,21 @@ def main():
 
     # Step 2: Load reference images + extract site images + full text
     references = load_reference_images(n=args.refs)
-    site_images = extract_image_urls(scraped["html"], url)
-    full_text = extract_text_content(scraped["html"])
-    print(f"[text] Extracted {len(full_text)} chars of page text")
+    home_idx = build_index(scraped["html"])     # one scan shared by every extractor below
+    site_images = extract_image_urls(scraped["html"], url, index=home_idx)
+    import re
+    homepage_text = extract_text_content(scraped["html"], index=home_idx)
+    pages = [{"label": "Homepage", "id": "home", "text": homepage_text}]
+    full_text_parts = [homepage_text]
+    subpages = (scrape_subpages(url, scraped["html"], max_pages=args.pages, homepage_index=home_idx)
+                if args.pages > 0 else [])
+    for sp in subpages:
+        sp_text = extract_text_content(sp["html"], max_chars=10000)
+        sp_id = re.sub(r"[^a-z0-9]+", "-", sp["label"].lower()).strip("-")
+        pages.append({"label": sp["label"], "id": sp_id, "text": sp_text})
+        full_text_parts.append(f"--- PAGE: {sp['label'].upper()} ---\n{sp_text}")
+    full_text = "\n\n".join(full_text_parts)
+    print(f"[text] Extracted {len(full_text)} chars of page text from {len(pages)} page(s)")
 
     # Step 3: Analyze (use cached result if available)
     slug = scraped["slug"]
@@ -2448,10 +2663,10 @@ def main():
         analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
         print(f"[analyze] ✓ Business: {analysis.get('business_name')} | Industry: {analysis.get('industry')}")
     else:
-        analysis = analyze_website(url, scraped["html"], args.name)
+        analysis = analyze_website(url, scraped["html"], args.name, full_text, pages)
 
     # Step 4: Generate
-    generated_html = generate_website(analysis, references, site_images, full_text, raw_html=scraped["html"])
+    generated_html = generate_website(analysis, references, site_images, full_text, pages, raw_html=scraped["html"])
 
     # Step 5: Bundle remote images as data URIs so the file is self-contained
     generated_html = inline_remote_images(generated_html)
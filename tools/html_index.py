@@ -0,0 +1,164 @@
+"""
+html_index.py
+Single-pass page index shared by every HTML extractor.
+
+One streaming html.parser pass over a scraped page collects everything the
+extractors in scrape_site.py / generate_website.py need — links with labels,
+images (src, srcset, lazy data-* attrs, raw tag text, header/nav position),
+visible and raw text, <style> blocks, inline style="" values and <meta> tags.
+Each extractor then queries the index instead of running its own DOTALL regex
+over the whole document, so a page costs one linear scan however many extractors
+touch it, and malformed multi-MB pages can no longer trigger regex backtracking.
+
+Nothing is cached here: a caller that runs several extractors on one page builds
+the index once and passes it in (index=...), and it is dropped with the page.
+Each extractor builds its own when called without one.
+
+Usage:
+    from html_index import build_index
+    idx = build_index(html)
+    for link in idx.links: ...
+    extract_text_content(html, index=idx)
+"""
+
+import re
+from html.parser import HTMLParser
+
+LAZY_ATTRS = ("data-src", "data-lazy-src", "data-original", "data-lazy", "data-bg")
+_BG_URL_RE = re.compile(r'background(?:-image)?\s*:\s*url\(["\']?([^)"\']+)["\']?\)', re.I)
+_HIDDEN_TEXT_TAGS = {"script", "style", "noscript"}
+_REGION_TAGS = {"header", "nav"}
+
+
+class PageIndex:
+    """Compact, read-only view of one HTML document."""
+
+    def __init__(self):
+        self.links = []          # {href, label, in_nav} for every <a href>, document order
+        self.images = []         # {src, tag, region} for every <img src>; region = header/nav index or None
+        self.lazy_urls = []      # data-src / data-lazy-src / ... values from any tag
+        self.srcsets = []        # raw srcset="" values from any tag (<img>, <source>)
+        self.style_blocks = []   # contents of <style> elements
+        self.inline_styles = []  # style="" attribute values
+        self.meta = {}           # <meta name|property> → content
+        self.text_blocks = []    # visible text (script/style/noscript excluded)
+        self.raw_blocks = []     # all character data incl. script/style (tag-stripped page)
+
+    @property
+    def text(self) -> str:
+        """Visible text, whitespace-collapsed."""
+        return re.sub(r"\s+", " ", " ".join(self.text_blocks)).strip()
+
+    @property
+    def raw_text(self) -> str:
+        """Every text node joined with spaces — equivalent to stripping all tags."""
+        return " ".join(self.raw_blocks)
+
+    def background_urls(self) -> list[str]:
+        """CSS background/background-image url(...) values from inline styles and
+        <style> blocks (inline first, mirroring document order of the old regex)."""
+        urls = []
+        for css in self.inline_styles + self.style_blocks:
+            urls += _BG_URL_RE.findall(css)
+        return urls
+
+    def header_images(self) -> list[dict]:
+        """Images inside the FIRST <header>/<nav> region of the page."""
+        return [img for img in self.images if img["region"] == 0]
+
+
+class _Indexer(HTMLParser):
+    def __init__(self, index: PageIndex):
+        super().__init__(convert_charrefs=True)
+        self.idx = index
+        self.hidden_depth = 0      # inside script/style/noscript
+        self.in_style = False
+        self.region_depth = 0      # nesting depth of header/nav
+        self.region_count = -1     # index of the current/last top-level header/nav region
+        self.anchor = None         # link dict currently collecting its label
+        self.style_buf = []
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: (v or "") for k, v in attrs}
+        idx = self.idx
+
+        if tag in _HIDDEN_TEXT_TAGS:
+            self.hidden_depth += 1
+            if tag == "style":
+                self.in_style = True
+                self.style_buf = []
+        if tag in _REGION_TAGS:
+            if self.region_depth == 0:
+                self.region_count += 1
+            self.region_depth += 1
+
+        if a.get("style"):
+            idx.inline_styles.append(a["style"])
+        for name in LAZY_ATTRS:
+            if a.get(name):
+                idx.lazy_urls.append(a[name])
+        if a.get("srcset"):
+            idx.srcsets.append(a["srcset"])
+
+        if tag == "a":
+            href = a.get("href", "").strip()
+            self.anchor = None
+            if href:
+                link = {"href": href, "label": "", "in_nav": self.region_depth > 0}
+                idx.links.append(link)
+                self.anchor = link
+        elif tag == "img":
+            if a.get("src"):
+                idx.images.append({
+                    "src": a["src"].strip(),
+                    "tag": self.get_starttag_text() or "",
+                    "region": self.region_count if self.region_depth > 0 else None,
+                })
+        elif tag == "meta":
+            key = a.get("name") or a.get("property")
+            if key and "content" in a:
+                idx.meta[key.lower()] = a["content"]
+
+    def handle_startendtag(self, tag, attrs):
+        # <img ... /> etc. — no content, and never opens a region/hidden block
+        if tag in _HIDDEN_TEXT_TAGS or tag in _REGION_TAGS or tag == "a":
+            return
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in _HIDDEN_TEXT_TAGS and self.hidden_depth:
+            self.hidden_depth -= 1
+            if tag == "style" and self.in_style:
+                self.idx.style_blocks.append("".join(self.style_buf))
+                self.in_style = False
+        elif tag in _REGION_TAGS and self.region_depth:
+            self.region_depth -= 1
+        elif tag == "a":
+            if self.anchor is not None:
+                self.anchor["label"] = self.anchor["label"].strip()
+            self.anchor = None
+
+    def handle_data(self, data):
+        self.idx.raw_blocks.append(data)
+        if self.in_style:
+            self.style_buf.append(data)
+        if self.hidden_depth:
+            return
+        self.idx.text_blocks.append(data)
+        if self.anchor is not None:
+            self.anchor["label"] += data
+
+
+def build_index(html: str) -> PageIndex:
+    """Tokenize `html` once and return its PageIndex. Never raises — a parser
+    failure returns whatever was indexed up to that point."""
+    index = PageIndex()
+    parser = _Indexer(index)
+    try:
+        parser.feed(html or "")
+        parser.close()
+    except Exception as e:
+        print(f"[html-index] Parse stopped early ({e}) — using partial index")
+    if parser.anchor is not None:
+        parser.anchor["label"] = parser.anchor["label"].strip()
+    return index
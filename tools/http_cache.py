@@ -0,0 +1,180 @@
+"""
+http_cache.py
+Conditional-GET disk cache for scraped pages (homepage, robots.txt, sitemaps,
+sub-pages). Used by http_client.get(..., cache=True).
+
+Each URL is stored as two files under .tmp/http_cache/: <key>.json (status,
+final URL, encoding, ETag / Last-Modified, stored_at) and <key>.body (raw bytes).
+  • younger than HTTP_CACHE_MAX_AGE seconds → served from disk, no request
+  • older, with a validator → revalidated with If-None-Match / If-Modified-Since;
+    a 304 refreshes the entry and serves the stored body
+  • otherwise → normal fetch, stored again on 200
+Writes are atomic (tmp file + os.replace) so both gunicorn workers can share it.
+Least-recently-used entries are evicted once the cache passes HTTP_CACHE_MAX_MB.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).parent.parent / ".tmp" / "http_cache"
+ENABLED   = os.environ.get("HTTP_CACHE_ENABLED", "true").lower() == "true"
+MAX_AGE   = int(os.environ.get("HTTP_CACHE_MAX_AGE", "600"))   # seconds served without revalidating
+MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_MB", "100")) * 1024 * 1024
+_EVICT_EVERY_BYTES = 8 * 1024 * 1024
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evicted": 0}
+_written_since_evict = 0
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def record(outcome: str) -> None:
+    """Count a lookup outcome decided by the caller: "hits", "revalidated" or "misses"."""
+    if outcome not in ("hits", "revalidated", "misses"):
+        raise ValueError(f"unknown cache outcome '{outcome}'")
+    _count(outcome)
+
+
+def stats() -> dict:
+    """{hits, revalidated, misses, stores} since process start (or reset_stats)."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset_stats() -> None:
+    with _lock:
+        for k in _counters:
+            _counters[k] = 0
+
+
+def _paths(url: str) -> tuple[Path, Path]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{key}.json", CACHE_DIR / f"{key}.body"
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def lookup(url: str) -> tuple[dict, bytes] | None:
+    """Return (meta, body) for a stored entry, or None."""
+    meta_p, body_p = _paths(url)
+    try:
+        meta = json.loads(meta_p.read_text(encoding="utf-8"))
+        body = body_p.read_bytes()
+        os.utime(body_p)                             # LRU clock
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url:
+        return None
+    return meta, body
+
+
+def is_fresh(meta: dict, max_age: int | None = None) -> bool:
+    max_age = MAX_AGE if max_age is None else max_age
+    return time.time() - meta.get("stored_at", 0) < max_age
+
+
+def conditional_headers(meta: dict) -> dict:
+    h = {}
+    if meta.get("etag"):
+        h["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        h["If-Modified-Since"] = meta["last_modified"]
+    return h
+
+
+def store(url: str, final_url: str, status: int, headers, encoding: str | None, body: bytes) -> None:
+    """Persist a 200 response. Failures are logged and ignored — caching is best-effort."""
+    cc = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cc:
+        return
+    meta = {
+        "url": url,
+        "final_url": final_url,
+        "status": status,
+        "encoding": encoding,
+        "content_type": headers.get("Content-Type"),
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "stored_at": time.time(),
+    }
+    global _written_since_evict
+    meta_p, body_p = _paths(url)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _atomic_write(body_p, body)
+        _atomic_write(meta_p, json.dumps(meta).encode("utf-8"))
+        _count("stores")
+    except OSError as e:
+        print(f"[http-cache] store failed for {url}: {e}")
+        return
+    with _lock:
+        _written_since_evict += len(body)
+        due = _written_since_evict >= _EVICT_EVERY_BYTES
+    if due:
+        evict()
+
+
+def touch(url: str, meta: dict) -> None:
+    """Mark a revalidated (304) entry fresh again."""
+    meta = dict(meta, stored_at=time.time())
+    meta_p, _ = _paths(url)
+    try:
+        _atomic_write(meta_p, json.dumps(meta).encode("utf-8"))
+    except OSError:
+        pass
+
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    """Delete least-recently-used entries (body + meta) until the cache fits in
+    max_bytes. Returns the number of bytes freed. Safe to run from several processes."""
+    global _written_since_evict
+    with _lock:
+        _written_since_evict = 0
+    if not CACHE_DIR.is_dir():
+        return 0
+    entries, total = [], 0
+    for entry in os.scandir(CACHE_DIR):
+        if not entry.name.endswith(".body"):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        for victim in (path[:-len(".body")] + ".json", path):
+            try:
+                os.remove(victim)     # meta first: a lone body is never served
+            except OSError:
+                pass
+        freed += size
+        _count("evicted")
+    print(f"[http-cache] Evicted {freed // 1024}KB (cache was {total // 1024}KB)")
+    return freed
+
+
+def log_stats(tag: str = "http-cache", since: dict | None = None) -> None:
+    """Print counters — only those after the `since` snapshot (from stats()) when given."""
+    s = stats()
+    if since is not None:
+        s = {k: v - since.get(k, 0) for k, v in s.items()}
+    print(f"[{tag}] hits={s['hits']} revalidated={s['revalidated']} misses={s['misses']} "
+          f"stores={s['stores']} evicted={s['evicted']}")
@@ -0,0 +1,306 @@
+"""
+http_client.py
+Shared outbound HTTP client for every fetch in tools/.
+
+One pooled requests.Session per worker process, so the homepage, robots.txt,
+sitemaps, sub-pages and images of one customer host reuse the same keep-alive
+connections instead of paying a TCP/TLS handshake per request. Image-heavy hosts
+can optionally go over HTTP/2 (HTTP2_ENABLED=true, needs `pip install httpx[http2]`).
+
+Usage:
+    import http_client
+    resp = http_client.get(url)                      # default UA, timeout, size cap
+    resp = http_client.get(url, timeout=4, stream=True)
+    resp = http_client.get(url, cache=True)           # conditional-GET disk cache
+    http_client.stats()                               # per-host call/byte/time counters
+    http_client.log_stats("server", since=snapshot)   # counters since an earlier stats()
+
+The pooled session never keeps cookies: it is shared by every job in the process,
+so a Set-Cookie from one customer's host must not ride along on the next job's
+requests. Cookies still flow within a single redirect chain.
+"""
+
+import os
+import time
+import threading
+import http.cookiejar
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+DEFAULT_HEADERS = {"User-Agent": USER_AGENT}
+DEFAULT_TIMEOUT = 10                    # seconds (connect + per-read)
+DEFAULT_MAX_BYTES = 8_000_000           # body cap for non-streamed responses
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_HOSTS", "32"))     # hosts kept pooled
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_PER_HOST", "16"))      # conns per host
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "false").lower() == "true"
+
+
+# Rejects every Set-Cookie — see module docstring
+_NO_COOKIES = http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+
+class ResponseTooLarge(requests.RequestException):
+    """Body exceeded the max_bytes cap — raised before the rest is downloaded."""
+
+
+_session: requests.Session | None = None
+_h2_client = None
+_init_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats: dict = {}
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _init_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers.update(DEFAULT_HEADERS)
+                s.cookies.set_policy(_NO_COOKIES)
+                _session = s
+    return _session
+
+
+def _get_h2_client():
+    """httpx client with HTTP/2 multiplexing, or None if disabled/unavailable."""
+    global _h2_client, HTTP2_ENABLED
+    if not HTTP2_ENABLED:
+        return None
+    if _h2_client is None:
+        with _init_lock:
+            if _h2_client is None:
+                try:
+                    import httpx
+                    _h2_client = httpx.Client(
+                        http2=True, headers=DEFAULT_HEADERS, follow_redirects=True,
+                        cookies=http.cookiejar.CookieJar(_NO_COOKIES),
+                        limits=httpx.Limits(max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                                            max_keepalive_connections=POOL_CONNECTIONS),
+                    )
+                except Exception as e:
+                    print(f"[http] HTTP/2 unavailable ({e}) — using HTTP/1.1 pool")
+                    HTTP2_ENABLED = False
+                    return None
+    return _h2_client
+
+
+def _record(url: str, status: int | None, nbytes: int, elapsed: float) -> None:
+    host = urlparse(url).netloc.lower()
+    with _stats_lock:
+        h = _stats.setdefault(host, {"calls": 0, "errors": 0, "bytes": 0, "seconds": 0.0})
+        h["calls"] += 1
+        h["bytes"] += nbytes
+        h["seconds"] += elapsed
+        if status is None or status >= 400:
+            h["errors"] += 1
+
+
+def stats() -> dict:
+    """Snapshot of per-host counters: {host: {calls, errors, bytes, seconds}}."""
+    with _stats_lock:
+        return {host: dict(v) for host, v in _stats.items()}
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _delta(snap: dict, since: dict) -> dict:
+    out = {}
+    for host, v in snap.items():
+        base = since.get(host, {})
+        d = {k: n - base.get(k, 0) for k, n in v.items()}
+        if d["calls"]:
+            out[host] = d
+    return out
+
+
+def log_stats(tag: str = "http", since: dict | None = None) -> None:
+    """Print totals — only what happened after the `since` snapshot when given, so
+    one job's line isn't the sum of every job the process has run."""
+    snap = stats()
+    if since is not None:
+        snap = _delta(snap, since)
+    if not snap:
+        return
+    calls = sum(v["calls"] for v in snap.values())
+    nbytes = sum(v["bytes"] for v in snap.values())
+    secs = sum(v["seconds"] for v in snap.values())
+    print(f"[{tag}] {calls} request(s) to {len(snap)} host(s), {nbytes // 1024}KB, {secs:.1f}s total")
+
+
+class _BufferedResponse:
+    """Minimal requests.Response look-alike for bodies that did not come through
+    the requests pool (HTTP/2 path, disk-cache hits)."""
+
+    def __init__(self, status_code: int, headers, url: str, content: bytes, encoding: str | None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.truncated = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 8192):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.url}", response=self)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _count_stream(resp, url: str, t0: float) -> None:
+    """Record a streamed response with the bytes the caller actually reads (not
+    Content-Length — callers often stop early), once it is consumed or closed."""
+    state = {"bytes": 0, "recorded": False}
+    read_chunks, close = resp.iter_content, resp.close
+
+    def record():
+        if not state["recorded"]:
+            state["recorded"] = True
+            _record(url, resp.status_code, state["bytes"], time.monotonic() - t0)
+
+    def iter_content(*args, **kwargs):
+        try:
+            for chunk in read_chunks(*args, **kwargs):
+                state["bytes"] += len(chunk)
+                yield chunk
+        finally:
+            record()
+
+    def close_and_record():
+        record()
+        close()
+
+    resp.iter_content = iter_content
+    resp.close = close_and_record
+
+
+def _from_cache(meta: dict, body: bytes) -> _BufferedResponse:
+    from requests.structures import CaseInsensitiveDict
+    headers = CaseInsensitiveDict({"Content-Type": meta.get("content_type") or "", "X-Cache": "HIT"})
+    return _BufferedResponse(meta.get("status", 200), headers, meta.get("final_url") or meta["url"],
+                             body, meta.get("encoding"))
+
+
+def get(url: str, *, headers: dict | None = None, timeout: float | None = None,
+        stream: bool = False, max_bytes: int | None = DEFAULT_MAX_BYTES,
+        http2: bool = False, cache: bool = False, max_age: int | None = None,
+        max_seconds: float | None = None, truncate: bool = False, **kwargs):
+    """GET through the shared pool. Returns a requests.Response (or a look-alike
+    on the HTTP/2 and cache paths). `headers` are merged over the default User-Agent.
+
+    Non-streamed bodies are read incrementally and abort with ResponseTooLarge once
+    they pass max_bytes (None = no cap) — or, with truncate=True, stop there and
+    return the first max_bytes with resp.truncated set (never cached). They abort
+    with requests.Timeout once the whole download takes longer than max_seconds
+    (requests' own timeout is per read).
+    With stream=True the caller reads the body and is responsible for its own caps.
+    http2=True opts this call into HTTP/2 when HTTP2_ENABLED is set and httpx is
+    installed; otherwise it is ignored. cache=True serves/stores the body through
+    the conditional-GET disk cache (see http_cache.py; max_age overrides the default)."""
+    import http_cache
+
+    if not (cache and http_cache.ENABLED and not stream):
+        return _fetch(url, headers, timeout, stream, max_bytes, http2, max_seconds, truncate, **kwargs)
+
+    entry = http_cache.lookup(url)
+    if entry and http_cache.is_fresh(entry[0], max_age):
+        http_cache.record("hits")
+        return _from_cache(*entry)
+    if entry:
+        headers = {**http_cache.conditional_headers(entry[0]), **(headers or {})}
+
+    resp = _fetch(url, headers, timeout, stream, max_bytes, False, max_seconds, truncate, **kwargs)
+    if entry and resp.status_code == 304:
+        http_cache.touch(url, entry[0])
+        http_cache.record("revalidated")
+        return _from_cache(*entry)
+    http_cache.record("misses")
+    if resp.status_code == 200 and not resp.truncated:
+        http_cache.store(url, resp.url, resp.status_code, resp.headers, resp.encoding, resp.content)
+    return resp
+
+
+def _fetch(url, headers, timeout, stream, max_bytes, http2, max_seconds, truncate, **kwargs):
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    t0 = time.monotonic()
+
+    h2 = _get_h2_client() if (http2 and not stream) else None
+    if h2 is not None:
+        try:
+            r = h2.get(url, headers=headers, timeout=timeout, **kwargs)
+            resp = _BufferedResponse(r.status_code, r.headers, str(r.url), r.content, r.encoding)
+        except Exception:
+            _record(url, None, 0, time.monotonic() - t0)
+            raise
+        _record(url, resp.status_code, len(resp.content), time.monotonic() - t0)
+        if max_bytes is not None and len(resp.content) > max_bytes:
+            if not truncate:
+                raise ResponseTooLarge(f"{url} exceeded {max_bytes} bytes")
+            resp.content = resp.content[:max_bytes]
+            resp.truncated = True
+        return resp
+
+    try:
+        resp = get_session().get(url, headers=headers, timeout=timeout, stream=True, **kwargs)
+    except Exception:
+        _record(url, None, 0, time.monotonic() - t0)
+        raise
+
+    if stream:
+        _count_stream(resp, url, t0)
+        return resp
+
+    # Read the body ourselves so an oversized or slow-dripping response is cut off early
+    chunks, size, resp.truncated = [], 0, False
+    try:
+        for chunk in resp.iter_content(65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                resp.close()
+                if not truncate:
+                    raise ResponseTooLarge(f"{url} exceeded {max_bytes} bytes")
+                chunks[-1] = chunk[:len(chunk) - (size - max_bytes)]
+                resp.truncated = True
+                break
+            if max_seconds is not None and time.monotonic() - t0 > max_seconds:
+                resp.close()
+                raise requests.Timeout(f"{url} took longer than {max_seconds:.0f}s")
+    finally:
+        _record(url, resp.status_code, size, time.monotonic() - t0)
+    resp._content = b"".join(chunks)
+    resp._content_consumed = True
+    return resp
@@ -0,0 +1,176 @@
+"""
+image_pool.py
+Process pool for CPU-bound Pillow work (decode → resize → encode-to-target).
+
+Decoding, LANCZOS resizing and JPEG quality-search loops used to run on gunicorn
+request threads and the _build_full_site thread, holding the GIL against the rest
+of the worker. They now run in a small pool of separate processes; the calling
+thread just waits on a future.
+
+  • one job API — transcode(data, ...) / transcode_file(path, ...):
+      decode, optionally reject small images, shrink into max_size, then encode as
+      JPEG / PNG / WEBP / AVIF / "auto" (PNG when the image has transparency),
+      stepping JPEG quality down until the output fits target_bytes
+  • large JPEG sources are decoded in draft mode (DCT scaling) straight to roughly
+    the output size instead of at full resolution
+  • buffers are pickled through the pipe; transcode_file() lets the worker read
+    an image on disk itself
+  • dhash(data) — 64-bit perceptual hash for near-duplicate detection
+  • off by default: every process with a pool pays for its own Pillow workers, so
+    only the job worker (tools/job_worker.py), which does nearly all image work,
+    starts one (IMAGE_PROCS=1). IMAGE_PROCS=0 (or a broken pool) runs the same job
+    in the calling thread
+
+Usage:
+    import image_pool
+    jpeg = image_pool.transcode(data, max_size=(800, 800), fmt="JPEG", quality=70)
+"""
+
+import io
+import os
+import atexit
+import threading
+
+IMAGE_PROCS   = int(os.environ.get("IMAGE_PROCS", "0"))
+JOB_TIMEOUT   = 60                  # seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+def _run_job(data: bytes, max_size=None, min_side=None, fmt="JPEG", quality=85,
+             target_bytes=None, min_quality=40, quality_step=15):
+    """The actual Pillow work. Returns encoded bytes, or None if the image is
+    smaller than min_side. Raises on undecodable input."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    if min_side and (img.width < min_side or img.height < min_side):
+        return None
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    out_fmt = ("PNG" if has_alpha else "JPEG") if fmt == "auto" else fmt
+
+    if max_size:
+        if img.format == "JPEG":
+            img.draft("RGB", max_size)      # DCT-domain downscale: decode at 1/2, 1/4, 1/8 size
+        if img.width > max_size[0] or img.height > max_size[1]:
+            img.thumbnail(max_size, Image.LANCZOS)
+
+    if out_fmt == "PNG":
+        buf = io.BytesIO()
+        img.convert("RGBA").save(buf, format="PNG", optimize=True)
+        return buf.getvalue()
+    if out_fmt in ("WEBP", "AVIF"):
+        # Both keep transparency; AVIF needs a Pillow build with libavif
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        buf = io.BytesIO()
+        img.save(buf, format=out_fmt, quality=quality)
+        return buf.getvalue()
+
+    rgb, q = img.convert("RGB"), quality
+    while True:
+        buf = io.BytesIO()
+        rgb.save(buf, format="JPEG", quality=q)
+        if target_bytes is None or buf.tell() <= target_bytes or q <= min_quality:
+            return buf.getvalue()
+        q -= quality_step
+
+
+def _dhash(data: bytes, size: int = 8) -> int:
+    """64-bit difference hash: grayscale 9×8, one bit per horizontal gradient sign.
+    Survives rescaling/recompression, so the same photo at different resolutions
+    lands within a few bits of itself."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        img.draft("L", (size * 8, size * 8))
+    px = list(img.convert("L").resize((size + 1, size), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = px[row * (size + 1) + col]
+            bits = (bits << 1) | (left > px[row * (size + 1) + col + 1])
+    return bits
+
+
+def _dispatch(data: bytes, spec: dict):
+    if spec.get("op") == "dhash":
+        return _dhash(data)
+    return _run_job(data, **spec)
+
+
+def _job_from_file(path: str, spec: dict):
+    with open(path, "rb") as f:
+        return _dispatch(f.read(), spec)
+
+
+def _job_from_bytes(data: bytes, spec: dict):
+    return _dispatch(data, spec)
+
+
+# ── Caller side ───────────────────────────────────────────────────────────────
+
+def get_pool():
+    """Process-wide ProcessPoolExecutor, created on first use. None if disabled."""
+    global _pool
+    if IMAGE_PROCS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # forkserver: never fork a gunicorn worker that has live threads
+                ctx = multiprocessing.get_context("forkserver")
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_PROCS, mp_context=ctx)
+                atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+                print(f"[img-pool] Started {IMAGE_PROCS} image worker process(es)")
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _submit(fn, *args):
+    """Run fn(*args) on the pool and wait; falls back to the calling thread if the
+    pool is disabled or has died (a crashed worker breaks the whole executor)."""
+    from concurrent.futures.process import BrokenProcessPool
+    pool = get_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.submit(fn, *args).result(timeout=JOB_TIMEOUT)
+    except BrokenProcessPool:
+        print("[img-pool] Worker pool broke — restarting, running this job inline")
+        _reset_pool()
+        return fn(*args)
+
+
+def transcode(data: bytes, **spec) -> bytes | None:
+    """Decode → resize → encode `data` off-thread. Keyword spec:
+    max_size (w, h), min_side, fmt ("JPEG" | "PNG" | "WEBP" | "AVIF" | "auto"), quality,
+    target_bytes, min_quality, quality_step. Returns None if the image is
+    below min_side; raises if it can't be decoded."""
+    return _submit(_job_from_bytes, data, spec)
+
+
+def dhash(data: bytes) -> int:
+    """64-bit perceptual difference hash of an image, computed off-thread."""
+    return _submit(_job_from_bytes, data, {"op": "dhash"})
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def transcode_file(path, **spec) -> bytes | None:
+    """transcode() for an image on disk — the worker reads the file itself."""
+    return _submit(_job_from_file, str(path), spec)
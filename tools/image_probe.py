@@ -0,0 +1,156 @@
+"""
+image_probe.py
+Read an image's pixel dimensions from its first few KB — no download, no decode.
+
+probe_url() sends an HTTP Range request for the first PROBE_BYTES and parses the
+JPEG / PNG / GIF / WebP / AVIF header directly. Only if the size is not in there
+(e.g. a JPEG whose SOF marker sits behind a large EXIF block) does it read on,
+up to MAX_PROBE_BYTES. Servers that ignore Range are handled by reading only the
+prefix and closing the connection. Results are cached per URL for the process.
+"""
+
+import struct
+import threading
+
+import http_client
+
+PROBE_BYTES     = 4096
+MAX_PROBE_BYTES = 65536
+_CACHE_MAX      = 4096
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+
+# ── Header parsers ────────────────────────────────────────────────────────────
+
+def _jpeg_size(data: bytes):
+    i, n = 2, len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:                       # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", data[i + 2:i + 4])[0]
+        # SOF0..SOF15 carry the frame size (C4 = DHT, C8 = JPG, CC = DAC are not SOFs)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return w, h
+        i += 2 + seg_len
+    return None
+
+
+def _png_size(data: bytes):
+    if len(data) >= 24 and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    return None
+
+
+def _gif_size(data: bytes):
+    if len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    return None
+
+
+def _webp_size(data: bytes):
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        w, h = struct.unpack("<HH", data[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        bits = struct.unpack("<I", data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        w = int.from_bytes(data[24:27], "little") + 1
+        h = int.from_bytes(data[27:30], "little") + 1
+        return w, h
+    return None
+
+
+def _avif_size(data: bytes):
+    # ISOBMFF: every 'ispe' (image spatial extents) box holds width/height; thumbnails
+    # have their own, so keep the largest.
+    best, pos = None, data.find(b"ispe")
+    while pos != -1 and pos + 16 <= len(data):
+        w, h = struct.unpack(">II", data[pos + 8:pos + 16])
+        if best is None or w * h > best[0] * best[1]:
+            best = (w, h)
+        pos = data.find(b"ispe", pos + 4)
+    return best
+
+
+def probe_dimensions(data: bytes) -> tuple[int, int] | None:
+    """(width, height) from an image header prefix, or None if unknown/incomplete."""
+    if data[:3] == b"\xff\xd8\xff":
+        return _jpeg_size(data)
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return _png_size(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return _gif_size(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _webp_size(data)
+    if data[4:8] == b"ftyp":
+        return _avif_size(data)
+    return None
+
+
+# ── Network probe ─────────────────────────────────────────────────────────────
+
+def _read_prefix(url: str, n: int, timeout: float) -> bytes | None:
+    """First n bytes of url via a Range request. None on HTTP error."""
+    with http_client.get(url, headers={"Range": f"bytes=0-{n - 1}"},
+                         timeout=timeout, stream=True) as resp:
+        if resp.status_code not in (200, 206):
+            return None
+        chunks, size = [], 0
+        for chunk in resp.iter_content(min(n, 16384)):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= n:
+                break          # server ignored Range — stop reading and drop the rest
+        return b"".join(chunks)[:n]
+
+
+def _pil_size(data: bytes):
+    """Last resort for exotic formats — PIL reads headers lazily, no pixel decode."""
+    try:
+        import io
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return img.width, img.height
+    except Exception:
+        return None
+
+
+def probe_url(url: str, timeout: float = 4) -> tuple[int, int] | None:
+    """(width, height) of a remote image, or None if it can't be determined."""
+    with _cache_lock:
+        if url in _cache:
+            return _cache[url]
+    try:
+        data = _read_prefix(url, PROBE_BYTES, timeout)
+        if data is None:
+            return None
+        dims = probe_dimensions(data)
+        if dims is None and len(data) >= PROBE_BYTES:
+            # Size marker is further in (big EXIF/ICC block) — read a larger prefix once
+            data = _read_prefix(url, MAX_PROBE_BYTES, timeout) or data
+            dims = probe_dimensions(data)
+        if dims is None:
+            dims = _pil_size(data)
+    except Exception:
+        return None
+    if dims is not None:
+        with _cache_lock:
+            if len(_cache) >= _CACHE_MAX:
+                _cache.pop(next(iter(_cache)))
+            _cache[url] = dims
+    return dims
@@ -0,0 +1,301 @@
+"""
+image_store.py
+Content-addressed image store shared by every image stage (Claude thumbnails,
+data-URI inlining, packaging).
+
+Without it one generation fetched the same site images up to four times —
+download_site_images_for_claude in /generate and again in _build_full_site, then
+inline_remote_images on every /status poll and /unlock. Now each URL is fetched
+once and everything else is a disk read:
+
+  .tmp/image_store/urls/<sha256(url)>.json   → {url, hash, stored_at, width, height}
+  .tmp/image_store/blobs/<hash>              → original bytes (sha256 of content)
+  .tmp/image_store/variants/<hash>.<key>     → derived bytes, e.g. "claude800"
+                                               (empty file = "not usable", cached too)
+
+Identical images served under different URLs share one blob and its variants.
+Least-recently-used files are evicted once the store passes IMAGE_STORE_MAX_MB.
+Writes are atomic (tmp file + os.replace), so both gunicorn workers share the
+store; within a process, concurrent requests for the same URL/variant wait for
+the first one instead of duplicating the work.
+
+Usage:
+    import image_store
+    data = image_store.original(url)                          # bytes | None
+    data, media = image_store.variant(url, "claude800", build_fn) or (None, None)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+import http_client
+
+STORE_DIR = Path(__file__).parent.parent / ".tmp" / "image_store"
+MAX_BYTES = int(os.environ.get("IMAGE_STORE_MAX_MB", "300")) * 1024 * 1024
+URL_TTL   = int(os.environ.get("IMAGE_STORE_URL_TTL", "86400"))   # seconds before a URL is re-fetched
+_EVICT_EVERY_BYTES = 32 * 1024 * 1024
+
+_lock = threading.Lock()
+_inflight: dict = {}        # key → [Lock, holders+waiters], so one thread does each fetch/build
+_counters = {"hits": 0, "fetches": 0, "variant_hits": 0, "variant_builds": 0, "evicted": 0}
+_written_since_evict = 0
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def log_stats(tag: str = "img-store", since: dict | None = None) -> None:
+    """Print counters — only those after the `since` snapshot (from stats()) when given."""
+    s = stats()
+    if since is not None:
+        s = {k: v - since.get(k, 0) for k, v in s.items()}
+    print(f"[{tag}] hits={s['hits']} fetches={s['fetches']} "
+          f"variant_hits={s['variant_hits']} variant_builds={s['variant_builds']} evicted={s['evicted']}")
+
+
+@contextmanager
+def _key_lock(key: str):
+    """Hold the per-key lock. The entry is reference-counted and only dropped when
+    no thread holds or waits on it — otherwise a newcomer would get a fresh lock
+    and run the same fetch/build alongside a waiter."""
+    with _lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _inflight[key]
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    global _written_since_evict
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    with _lock:
+        _written_since_evict += len(data)
+        due = _written_since_evict >= _EVICT_EVERY_BYTES
+    if due:
+        evict()
+
+
+def _read(path: Path) -> bytes | None:
+    """Read a stored file and bump its mtime (the LRU clock)."""
+    try:
+        data = path.read_bytes()
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def sniff_media_type(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    if data.lstrip()[:5] in (b"<svg ", b"<?xml"):
+        return "image/svg+xml"
+    return "image/jpeg"
+
+
+# ── Originals ─────────────────────────────────────────────────────────────────
+
+def _url_path(url: str) -> Path:
+    return STORE_DIR / "urls" / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+
+def _blob_path(content_hash: str) -> Path:
+    return STORE_DIR / "blobs" / content_hash
+
+
+def _url_meta(url: str) -> dict | None:
+    try:
+        meta = json.loads(_url_path(url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or time.time() - meta.get("stored_at", 0) > URL_TTL:
+        return None
+    return meta
+
+
+def _lookup_hash(url: str) -> str | None:
+    """Content hash stored for url, without reading the blob."""
+    meta = _url_meta(url)
+    return meta["hash"] if meta else None
+
+
+def _lookup(url: str) -> tuple[str, bytes] | None:
+    content_hash = _lookup_hash(url)
+    if not content_hash:
+        return None
+    data = _read(_blob_path(content_hash))
+    return (content_hash, data) if data is not None else None
+
+
+def fetch(url: str, timeout: float = 8) -> tuple[str, bytes] | None:
+    """(content_hash, original bytes) for url — from the store, or downloaded once
+    and stored. None if the image can't be fetched (failures are not cached)."""
+    hit = _lookup(url)
+    if hit:
+        _count("hits")
+        return hit
+    with _key_lock(f"url:{url}"):
+        hit = _lookup(url)               # another thread may have fetched it meanwhile
+        if hit:
+            _count("hits")
+            return hit
+        return _download(url, timeout)
+
+
+def _download(url: str, timeout: float) -> tuple[str, bytes] | None:
+    try:
+        resp = http_client.get(url, timeout=timeout, http2=True)
+    except Exception:
+        return None
+    if resp.status_code != 200 or not resp.content:
+        return None
+    from image_probe import probe_dimensions
+    data = resp.content
+    content_hash = hashlib.sha256(data).hexdigest()
+    _count("fetches")
+    width, height = probe_dimensions(data) or (None, None)     # header parse, no decode
+    try:
+        if not _blob_path(content_hash).exists():
+            _atomic_write(_blob_path(content_hash), data)
+        _atomic_write(_url_path(url), json.dumps(
+            {"url": url, "hash": content_hash, "stored_at": time.time(),
+             "width": width, "height": height}).encode("utf-8"))
+    except OSError as e:
+        print(f"[img-store] store failed for {url}: {e}")
+    return content_hash, data
+
+
+def original(url: str, timeout: float = 8) -> bytes | None:
+    hit = fetch(url, timeout)
+    return hit[1] if hit else None
+
+
+def original_dims(url: str) -> tuple[int, int] | None:
+    """(width, height) of the stored original for url, recorded when it was fetched —
+    no blob read. None if unknown (not stored, or stored before dims were kept)."""
+    meta = _url_meta(url)
+    if not meta or not meta.get("width") or not meta.get("height"):
+        return None
+    return meta["width"], meta["height"]
+
+
+def original_size(url: str) -> int:
+    """Byte size of the stored original for url (0 if unknown) — a stat, no read."""
+    content_hash = _lookup_hash(url)
+    try:
+        return os.path.getsize(_blob_path(content_hash)) if content_hash else 0
+    except OSError:
+        return 0
+
+
+# ── Derived variants ──────────────────────────────────────────────────────────
+
+def variant(url: str, key: str, build, timeout: float = 8) -> tuple[bytes, str] | None:
+    """Derived image for url, built at most once per (content, key).
+
+    build(original_bytes) returns the derived bytes, or None when the image is not
+    usable for this purpose (too small, undecodable) — that verdict is cached as
+    well. Returns (bytes, media_type) or None.
+    A variant that is already stored is served without reading the original."""
+    content_hash = _lookup_hash(url)
+    cached = _read(_variant_path(content_hash, key)) if content_hash else None
+    if cached is not None:
+        _count("variant_hits")
+    else:
+        hit = fetch(url, timeout)
+        if not hit:
+            return None
+        content_hash, data = hit
+        with _key_lock(f"variant:{content_hash}.{key}"):
+            cached = _build_variant(_variant_path(content_hash, key), data, build, key, url)
+
+    if not cached:
+        return None
+    return cached, sniff_media_type(cached)
+
+
+def _variant_path(content_hash: str, key: str) -> Path:
+    return STORE_DIR / "variants" / f"{content_hash}.{key}"
+
+
+def _build_variant(path: Path, data: bytes, build, key: str, url: str) -> bytes | None:
+    cached = _read(path)                 # built by another thread while we waited
+    if cached is not None:
+        _count("variant_hits")
+        return cached
+    try:
+        cached = build(data) or b""
+    except Exception as e:
+        print(f"[img-store] variant {key} failed for {url.split('/')[-1][:40]}: {e}")
+        return None
+    _count("variant_builds")
+    try:
+        _atomic_write(path, cached)
+    except OSError as e:
+        print(f"[img-store] store failed for {path.name}: {e}")
+    return cached
+
+
+# ── Eviction ──────────────────────────────────────────────────────────────────
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    """Delete least-recently-used files until the store fits in max_bytes.
+    Returns the number of bytes freed. Safe to run from several processes."""
+    global _written_since_evict
+    with _lock:
+        _written_since_evict = 0
+    files, total = [], 0
+    for sub in ("blobs", "variants", "urls"):
+        d = STORE_DIR / sub
+        if not d.is_dir():
+            continue
+        for entry in os.scandir(d):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    for _, size, path in sorted(files):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)       # a url entry whose blob is gone simply misses next time
+            freed += size
+            _count("evicted")
+        except OSError:
+            pass
+    print(f"[img-store] Evicted {freed // 1024}KB (store was {total // 1024}KB)")
+    return freed
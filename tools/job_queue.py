@@ -0,0 +1,364 @@
+"""
+job_queue.py
+Durable job queue for the long-running generation jobs.
+
+Scrape → analysis → hero and the full-site build used to run in
+threading.Thread(daemon=True) inside the gunicorn workers, so every deploy or
+worker recycle silently killed whatever was in flight. Jobs are now rows in a
+persistent queue and run in a separate worker process (tools/job_worker.py):
+
+  • enqueue(kind, payload, ref=...) — payload is the handler's kwargs (JSON);
+    ref groups a generation's jobs so /status can ask active(ref)
+  • a worker claims a job with a lease (JOB_LEASE_SECONDS) and heartbeats it while
+    the handler runs; a job whose worker died is re-claimed once its lease expires
+  • an uncaught handler exception is retried with backoff, up to JOB_MAX_ATTEMPTS
+    attempts in total (lost leases count as attempts too); once a job is given up,
+    the handler's on_give_up(error, **payload) hook runs
+  • SIGTERM/SIGINT → graceful drain: stop claiming, let running jobs finish for up
+    to JOB_DRAIN_SECONDS, then hand the rest back to the queue without counting
+    an attempt. Render sends SIGKILL 30 s after SIGTERM, so the default (25 s) only
+    lets short jobs finish; a long build is released and picked up again after
+    the restart rather than waited on
+  • stalled(ref) tells a job that is due but nobody claims (no live worker) apart
+    from one that is merely waiting for a retry; cancel(ref) drops queued jobs
+
+Backends are chosen by JOB_QUEUE_URL; "sqlite:///<path>" is built in (default
+.tmp/jobs.db). On the default Render free plan that file is on the instance's
+local disk, which every deploy wipes — jobs then survive worker crashes and
+restarts, but not a deploy. Point JOB_QUEUE_URL at a persistent disk (see
+render.yaml) to cover deploys as well. Others (Redis, Postgres) plug in with
+register_backend().
+
+Usage:
+    import job_queue
+
+    @job_queue.handler("full_site")
+    def build(generation_id, ctx): ...
+
+    job_queue.enqueue("full_site", {"generation_id": gid, "ctx": ctx}, ref=gid)
+"""
+
+import os
+import json
+import time
+import uuid
+import signal
+import socket
+import sqlite3
+import threading
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_DB    = Path(__file__).parent.parent / ".tmp" / "jobs.db"
+QUEUE_URL     = os.environ.get("JOB_QUEUE_URL", f"sqlite:///{DEFAULT_DB}")
+LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS  = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+CONCURRENCY   = int(os.environ.get("JOB_CONCURRENCY", "4"))
+DRAIN_SECONDS = int(os.environ.get("JOB_DRAIN_SECONDS", "25"))   # must end before the platform's SIGKILL
+STALL_SECONDS = int(os.environ.get("JOB_STALL_SECONDS", "600"))
+POLL_SECONDS  = 1.0
+RETRY_BACKOFF = 30              # seconds × attempt number
+
+_handlers: dict = {}
+_backends: dict = {}
+_queue = None
+_queue_lock = threading.Lock()
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    ref: str | None
+    payload: dict
+    attempts: int
+    max_attempts: int
+    gave_up: bool = False           # lease expired on the final attempt — nothing to run
+
+
+# ── SQLite backend ────────────────────────────────────────────────────────────
+
+class SQLiteBackend:
+    """Queue table in one SQLite file, shared by the web and worker processes (WAL)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id            TEXT PRIMARY KEY,
+                kind          TEXT NOT NULL,
+                ref           TEXT,
+                payload       TEXT NOT NULL,
+                state         TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                max_attempts  INTEGER NOT NULL,
+                lease_owner   TEXT,
+                lease_expires REAL,
+                run_after     REAL NOT NULL,
+                last_error    TEXT,
+                created_at    REAL NOT NULL,
+                updated_at    REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, run_after);
+            CREATE INDEX IF NOT EXISTS idx_jobs_ref   ON jobs(ref);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, kind: str, ref: str | None, payload: dict, max_attempts: int) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO jobs (id, kind, ref, payload, max_attempts, run_after, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, ref, json.dumps(payload), max_attempts, now, now, now))
+        return cur.rowcount == 1
+
+    def claim(self, owner: str, lease_seconds: int) -> Job | None:
+        conn = self._conn()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")          # one claimer at a time across processes
+            try:
+                row = conn.execute(
+                    "SELECT id, kind, ref, payload, state, attempts, max_attempts FROM jobs "
+                    "WHERE (state = 'queued' AND run_after <= ?) OR (state = 'running' AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1", (now, now)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                job_id, kind, ref, payload, state, attempts, max_attempts = row
+                if state == "running" and attempts >= max_attempts:
+                    conn.execute("UPDATE jobs SET state = 'failed', lease_owner = NULL, updated_at = ?, "
+                                 "last_error = 'lease expired on final attempt' WHERE id = ?", (now, job_id))
+                    conn.execute("COMMIT")
+                    return Job(job_id, kind, ref, json.loads(payload), attempts, max_attempts, gave_up=True)
+                if state == "running":
+                    print(f"[jobs] {job_id} lease expired — re-claiming (attempt {attempts + 1}/{max_attempts})")
+                conn.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_owner = ?, "
+                             "lease_expires = ?, updated_at = ? WHERE id = ?",
+                             (owner, now + lease_seconds, now, job_id))
+                conn.execute("COMMIT")
+                return Job(job_id, kind, ref, json.loads(payload), attempts + 1, max_attempts)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _owned_update(self, sql: str, params: tuple, job_id: str, owner: str) -> bool:
+        cur = self._conn().execute(f"{sql} WHERE id = ? AND lease_owner = ? AND state = 'running'",
+                                   (*params, job_id, owner))
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id: str, owner: str, lease_seconds: int) -> bool:
+        now = time.time()
+        return self._owned_update("UPDATE jobs SET lease_expires = ?, updated_at = ?",
+                                  (now + lease_seconds, now), job_id, owner)
+
+    def complete(self, job_id: str, owner: str) -> bool:
+        return self._owned_update("UPDATE jobs SET state = 'done', lease_owner = NULL, updated_at = ?",
+                                  (time.time(),), job_id, owner)
+
+    def fail(self, job_id: str, owner: str, error: str, retry_in: float | None) -> bool:
+        now = time.time()
+        if retry_in is None:
+            return self._owned_update("UPDATE jobs SET state = 'failed', lease_owner = NULL, last_error = ?, "
+                                      "updated_at = ?", (error, now), job_id, owner)
+        return self._owned_update("UPDATE jobs SET state = 'queued', lease_owner = NULL, last_error = ?, "
+                                  "run_after = ?, updated_at = ?", (error, now + retry_in, now), job_id, owner)
+
+    def release(self, job_id: str, owner: str) -> bool:
+        """Hand a running job back (drain) without counting the interrupted attempt."""
+        now = time.time()
+        return self._owned_update("UPDATE jobs SET state = 'queued', lease_owner = NULL, "
+                                  "attempts = attempts - 1, run_after = ?, updated_at = ?", (now, now), job_id, owner)
+
+    def active(self, ref: str) -> bool:
+        row = self._conn().execute("SELECT 1 FROM jobs WHERE ref = ? AND state IN ('queued', 'running') LIMIT 1",
+                                   (ref,)).fetchone()
+        return row is not None
+
+    def stalled(self, ref: str, after: float) -> bool:
+        row = self._conn().execute("SELECT 1 FROM jobs WHERE ref = ? AND state = 'queued' AND run_after < ? LIMIT 1",
+                                   (ref, time.time() - after)).fetchone()
+        return row is not None
+
+    def cancel(self, ref: str) -> int:
+        cur = self._conn().execute("UPDATE jobs SET state = 'failed', last_error = 'cancelled', updated_at = ? "
+                                   "WHERE ref = ? AND state = 'queued'", (time.time(), ref))
+        return cur.rowcount
+
+
+def register_backend(scheme: str, factory) -> None:
+    """factory(url_rest) → backend with enqueue/claim/heartbeat/complete/fail/release/
+    active/stalled/cancel."""
+    _backends[scheme] = factory
+
+
+register_backend("sqlite", lambda rest: SQLiteBackend(rest[1:] if rest.startswith("/") else rest))
+
+
+def get_queue():
+    """Process-wide backend for JOB_QUEUE_URL, created on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                scheme, _, rest = QUEUE_URL.partition("://")
+                if scheme not in _backends:
+                    raise RuntimeError(f"JOB_QUEUE_URL: no backend registered for '{scheme}'")
+                _queue = _backends[scheme](rest)
+    return _queue
+
+
+# ── Producer side ─────────────────────────────────────────────────────────────
+
+def handler(kind: str, on_give_up=None):
+    """Register fn as the handler for `kind`; it is called as fn(**payload).
+    on_give_up(error, **payload) runs once the job has failed for good."""
+    def register(fn):
+        _handlers[kind] = (fn, on_give_up)
+        return fn
+    return register
+
+
+def enqueue(kind: str, payload: dict, ref: str | None = None, job_id: str | None = None,
+            max_attempts: int = MAX_ATTEMPTS) -> str:
+    """Queue a job. With an explicit job_id this is idempotent — a job that already
+    exists (queued, running or finished) is not queued twice."""
+    job_id = job_id or uuid.uuid4().hex
+    if get_queue().enqueue(job_id, kind, ref, payload, max_attempts):
+        print(f"[jobs] Queued {kind} job {job_id}")
+    else:
+        print(f"[jobs] {kind} job {job_id} already queued — skipped")
+    return job_id
+
+
+def active(ref: str) -> bool:
+    """True while any job for ref is queued or running (incl. waiting for a retry)."""
+    return get_queue().active(ref)
+
+
+def stalled(ref: str, after: float = STALL_SECONDS) -> bool:
+    """True if a job for ref has been due for more than `after` seconds without any
+    worker claiming it — the worker process is down or hopelessly backed up."""
+    return get_queue().stalled(ref, after)
+
+
+def cancel(ref: str) -> int:
+    """Drop ref's queued (not running) jobs, e.g. once the generation is marked
+    failed, so a worker coming back later doesn't resurrect it. Returns how many."""
+    return get_queue().cancel(ref)
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+class Worker:
+    """Claims jobs and runs up to `concurrency` of them on threads (the work is
+    I/O-bound: scraping and streaming model calls)."""
+
+    def __init__(self, concurrency: int = CONCURRENCY):
+        self.concurrency = concurrency
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.queue = get_queue()
+        self._draining = threading.Event()
+        self._running: dict = {}                 # job id → thread
+        self._lock = threading.Lock()
+
+    def drain(self, *_):
+        if not self._draining.is_set():
+            print(f"[jobs] Draining — no new jobs, waiting up to {DRAIN_SECONDS}s for {len(self._running)} running")
+            self._draining.set()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+        print(f"[jobs] Worker {self.owner} started — {self.concurrency} slot(s), handlers: {sorted(_handlers)}")
+        while not self._draining.is_set():
+            with self._lock:
+                free = len(self._running) < self.concurrency
+            job = None
+            if free:
+                try:
+                    job = self.queue.claim(self.owner, LEASE_SECONDS)
+                except Exception as e:
+                    print(f"[jobs] Claim failed: {e}")
+            if job is None:
+                self._draining.wait(POLL_SECONDS)
+                continue
+            if job.gave_up:
+                self._give_up(job, "Generation was interrupted too many times — please try again")
+                continue
+            t = threading.Thread(target=self._execute, args=(job,), name=f"job-{job.id}", daemon=True)
+            with self._lock:
+                self._running[job.id] = t
+            t.start()
+        self._finish_drain()
+
+    def _finish_drain(self) -> None:
+        deadline = time.monotonic() + DRAIN_SECONDS
+        for t in list(self._running.values()):
+            t.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            leftover = list(self._running)
+        for job_id in leftover:
+            self.queue.release(job_id, self.owner)
+            print(f"[jobs] {job_id} still running at drain deadline — handed back to the queue")
+        print("[jobs] Worker stopped")
+
+    def _give_up(self, job: Job, error: str) -> None:
+        print(f"[jobs] ✗ {job.kind} job {job.id} given up after {job.attempts} attempt(s): {error}")
+        _, on_give_up = _handlers.get(job.kind, (None, None))
+        if on_give_up is None:
+            return
+        try:
+            on_give_up(error, **job.payload)
+        except Exception:
+            traceback.print_exc()
+
+    def _heartbeat(self, job: Job, stop: threading.Event) -> None:
+        while not stop.wait(LEASE_SECONDS / 3):
+            try:
+                if not self.queue.heartbeat(job.id, self.owner, LEASE_SECONDS):
+                    print(f"[jobs] {job.id} lease lost — another worker may have taken it over")
+                    return
+            except Exception as e:
+                print(f"[jobs] Heartbeat failed for {job.id}: {e}")
+
+    def _execute(self, job: Job) -> None:
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True).start()
+        start = time.monotonic()
+        try:
+            fn, _ = _handlers.get(job.kind, (None, None))
+            if fn is None:
+                raise RuntimeError(f"no handler registered for '{job.kind}'")
+            print(f"[jobs] Running {job.kind} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+            fn(**job.payload)
+            stop.set()
+            self.queue.complete(job.id, self.owner)
+            print(f"[jobs] ✓ {job.kind} job {job.id} done in {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            stop.set()
+            traceback.print_exc()
+            retry_in = RETRY_BACKOFF * job.attempts if job.attempts < job.max_attempts else None
+            if self.queue.fail(job.id, self.owner, str(e)[:2000], retry_in) and retry_in is None:
+                self._give_up(job, str(e))
+            elif retry_in is not None:
+                print(f"[jobs] ✗ {job.kind} job {job.id} failed: {e} — retrying in {retry_in}s")
+        finally:
+            stop.set()
+            with self._lock:
+                self._running.pop(job.id, None)
+
+
+def run_worker(concurrency: int = CONCURRENCY) -> None:
+    Worker(concurrency).run()
@@ -0,0 +1,30 @@
+"""
+job_worker.py
+Worker process for the durable job queue (see job_queue.py).
+
+Importing server registers the job handlers (generate, full_site); this process
+then claims and runs queued jobs until it receives SIGTERM/SIGINT, which starts
+a graceful drain. gunicorn.conf.py starts one next to the web workers; more can
+run on other hosts when JOB_QUEUE_URL points at a shared backend.
+
+Usage:
+    python tools/job_worker.py [--concurrency N]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# This process does the packaging / thumbnail work — give it the one image pool
+os.environ.setdefault("IMAGE_PROCS", "1")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import server  # noqa: F401 — registers the job handlers
+import job_queue
+
+if __name__ == "__main__":
+    concurrency = job_queue.CONCURRENCY
+    if "--concurrency" in sys.argv:
+        concurrency = int(sys.argv[sys.argv.index("--concurrency") + 1])
+    job_queue.run_worker(concurrency)
@@ -0,0 +1,201 @@
+"""
+reference_cache.py
+Precomputed, memory-mapped reference-design payloads for the vision prompts.
+
+load_reference_images used to open, recompress and base64-encode the same
+reference_designs/*.png|jpg on every /generate and again in every _build_full_site.
+This module does that once and writes the result to .tmp/reference_cache/:
+
+  payloads.<build>.bin → base64 JPEG payloads back to back (ready to drop into a prompt)
+  manifest.json        → {stem: {file, offset, length, media_type, src_size, src_mtime}}
+                         plus the bin name and encode settings, used to detect stale caches
+
+Each worker process memory-maps the payload file and slices out what it needs; the
+industry → candidate-stems lists from index.json are resolved into a dict at load,
+so picking references is a dict lookup. The cache is rebuilt automatically when a
+source image, index.json or the encode settings change (builds are serialised with
+a file lock so both gunicorn workers don't encode at once).
+
+Build ahead of time (e.g. in the Render build command):
+    python tools/reference_cache.py
+"""
+
+import os
+import json
+import mmap
+import time
+import base64
+import threading
+from pathlib import Path
+
+REFERENCE_DIR = Path(__file__).parent.parent / "reference_designs"
+CACHE_DIR     = Path(__file__).parent.parent / ".tmp" / "reference_cache"
+VISION_MAX_DIM = 1568           # long edge the vision model uses without downscaling
+MAX_BYTES      = 4_500_000      # per-image API limit (with headroom)
+SETTINGS       = {"max_dim": VISION_MAX_DIM, "max_bytes": MAX_BYTES, "version": 1}
+
+# Checked in this order against the (lower-cased) industry string; specific trades
+# come before the generic "handwerk" fallback.
+INDUSTRY_PRIORITY = [
+    "food", "restaurant", "cafe", "bakery", "catering",
+    "tech", "saas", "finance", "legal", "consulting",
+    "real_estate", "luxury", "architecture",
+    "maler", "schreiner", "garten", "dach", "elektr", "sanitaer", "bau",
+    "handwerk",
+    "health", "wellness", "medical", "dental", "beauty", "product",
+]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _sources() -> dict:
+    """{stem: Path} for every reference image; .png wins over .jpg for the same stem."""
+    found = {}
+    for p in sorted(REFERENCE_DIR.glob("*.jpg")) + sorted(REFERENCE_DIR.glob("*.png")):
+        found[p.stem] = p
+    return found
+
+
+def _fingerprint(path: Path) -> dict:
+    st = path.stat()
+    return {"src_size": st.st_size, "src_mtime": int(st.st_mtime)}
+
+
+def _encode(path: Path) -> tuple[bytes, str] | tuple[None, None]:
+    """Vision-ready JPEG for one reference image (raw bytes if Pillow is missing)."""
+    try:
+        import image_pool
+        data = image_pool.transcode_file(path, max_size=(VISION_MAX_DIM, VISION_MAX_DIM), fmt="JPEG",
+                                         quality=85, target_bytes=MAX_BYTES, quality_step=15)
+        return data, "image/jpeg"
+    except ImportError:
+        raw = path.read_bytes()
+        if len(raw) > MAX_BYTES:
+            return None, None
+        return raw, "image/png" if path.suffix == ".png" else "image/jpeg"
+
+
+def _index_fingerprint() -> int:
+    p = REFERENCE_DIR / "index.json"
+    return int(p.stat().st_mtime) if p.exists() else 0
+
+
+def build(force: bool = False) -> bool:
+    """(Re)build the cache if it is missing or stale. Returns True if it was rebuilt."""
+    try:
+        import fcntl                              # POSIX only — always there under gunicorn
+    except ImportError:
+        fcntl = None                              # Windows dev server: one process, no lock needed
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(CACHE_DIR / ".lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)      # the other worker waits, then finds it fresh
+        if not force and not _is_stale():
+            return False
+        sources = _sources()
+        bin_name = f"payloads.{int(time.time() * 1000)}.bin"   # new name per build: readers never see a half-swap
+        manifest = {"settings": SETTINGS, "index_mtime": _index_fingerprint(), "bin": bin_name, "entries": {}}
+        tmp_bin = CACHE_DIR / f"{bin_name}.{os.getpid()}.tmp"
+        offset = 0
+        with open(tmp_bin, "wb") as out:
+            for stem, path in sources.items():
+                raw, media_type = _encode(path)
+                if raw is None:
+                    print(f"[refs] Skipping {path.name} (too large, install Pillow to compress)")
+                    continue
+                payload = base64.standard_b64encode(raw)
+                out.write(payload)
+                manifest["entries"][stem] = {
+                    "file": path.name, "offset": offset, "length": len(payload),
+                    "media_type": media_type, "kb": len(raw) // 1024, **_fingerprint(path),
+                }
+                offset += len(payload)
+        os.replace(tmp_bin, CACHE_DIR / bin_name)
+        tmp_manifest = CACHE_DIR / f"manifest.json.{os.getpid()}.tmp"
+        tmp_manifest.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_manifest, CACHE_DIR / "manifest.json")
+        for old_bin in CACHE_DIR.glob("payloads.*.bin"):
+            if old_bin.name != bin_name:
+                old_bin.unlink(missing_ok=True)       # mmaps of it in running workers stay valid
+        print(f"[refs] Reference cache built: {len(manifest['entries'])} design(s), {offset // 1024}KB")
+        return True
+
+
+def _is_stale() -> bool:
+    try:
+        manifest = json.loads((CACHE_DIR / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return True
+    if not (CACHE_DIR / manifest.get("bin", "")).is_file():
+        return True
+    if manifest.get("settings") != SETTINGS or manifest.get("index_mtime") != _index_fingerprint():
+        return True
+    entries = manifest.get("entries", {})
+    sources = _sources()
+    if set(sources) != set(entries):
+        return True
+    return any(
+        entries[stem]["file"] != path.name or
+        {k: entries[stem][k] for k in ("src_size", "src_mtime")} != _fingerprint(path)
+        for stem, path in sources.items()
+    )
+
+
+class ReferenceCache:
+    """Read-only view of the built cache for one worker process."""
+
+    def __init__(self):
+        manifest = json.loads((CACHE_DIR / "manifest.json").read_text(encoding="utf-8"))
+        self.entries: dict = manifest["entries"]
+        with open(CACHE_DIR / manifest["bin"], "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if f.seek(0, 2) else b""
+
+        # industry key → priority-ordered candidate stems (industry first, generic fill)
+        self.candidates: dict = {}
+        try:
+            index = json.loads((REFERENCE_DIR / "index.json").read_text(encoding="utf-8"))
+            industry_map = index.get("industry_map", {})
+        except (OSError, ValueError) as e:
+            print(f"[refs] index.json error ({e}) — falling back to random")
+            industry_map = {}
+        generic = industry_map.get("generic", [])
+        for key, ordered in industry_map.items():
+            self.candidates[key] = [s for s in dict.fromkeys(ordered + generic) if s in self.entries]
+
+    def payload(self, stem: str) -> dict:
+        e = self.entries[stem]
+        data = self._mm[e["offset"]:e["offset"] + e["length"]].decode("ascii")
+        return {"path": str(REFERENCE_DIR / e["file"]), "data": data, "media_type": e["media_type"]}
+
+
+def match_industry(industry: str) -> str | None:
+    ind_lower = (industry or "").lower()
+    return next((key for key in INDUSTRY_PRIORITY if key in ind_lower), None)
+
+
+def get() -> ReferenceCache | None:
+    """Process-wide cache, built if needed on first use. None if it can't be built."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    build()
+                    _cache = ReferenceCache()
+                except Exception as e:
+                    print(f"[refs] Reference cache unavailable ({e})")
+                    return None
+    return _cache
+
+
+def reload() -> None:
+    """Drop the in-process view; the next get() rebuilds if sources changed."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+if __name__ == "__main__":
+    import sys
+    build(force="--force" in sys.argv)
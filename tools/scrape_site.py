@@ -1,18 +1,25 @@
 """
 scrape_site.py
-Fetches a website's HTML and takes a screenshot via Playwright.
+Fetches a website's HTML and renders it once via Playwright (DOM + screenshot).
 Outputs to .tmp/
 """
 
 import sys
 import os
 import re
+import threading
 import requests
 from pathlib import Path
 
+import http_client
+from html_index import PageIndex, build_index
+
 TMP = Path(__file__).parent.parent / ".tmp"
 TMP.mkdir(exist_ok=True)
 
+RENDER_OVERLAP = os.environ.get("RENDER_OVERLAP", "true").lower() == "true"  # browser render runs alongside the HTTP fetch
+RENDER_TIMEOUT = 45  # seconds to wait for the pooled render (queue time + navigation)
+
 
 def slugify(url: str) -> str:
     url = re.sub(r"https?://", "", url)
@@ -20,17 +27,56 @@ def slugify(url: str) -> str:
     return url[:60]
 
 
-def _xml_locs(root, tag_path_ns: str, tag_path_bare: str, ns: dict) -> list:
-    """Find XML elements trying namespace first, then no-namespace fallback."""
-    result = root.findall(tag_path_ns, ns)
-    if not result:
-        result = root.findall(tag_path_bare)
-    return result
-
+SITEMAP_MAX_BYTES = 2_000_000   # per sitemap document — enough for thousands of <url> entries
+SITEMAP_WORKERS   = 4           # concurrent candidate / sub-sitemap fetches
+
+_SITEMAP_SKIP = [
+    "impressum", "datenschutz", "privacy", "legal", "agb", "cookie",
+    "login", "register", "cart", "warenkorb", "404", "sitemap",
+    "rss", "feed", "wp-", "admin", "logout", "tag/", "category/",
+    "author/", "/page/", "feed/", "wp-content",
+]
+_SITEMAP_IMPORTANT = [
+    "about", "uber", "über", "equipe", "team", "uns", "wir",
+    "contact", "kontakt", "service", "leistung", "angebot", "offer",
+    "dienstleistung", "menu", "speise", "karte", "food", "drink",
+    "kueche", "gallery", "galerie", "portfolio", "work", "referenz",
+    "price", "preis", "tarif", "kosten", "paket", "product",
+    "produkt", "shop", "funktion", "feature", "demo", "reserv", "termin",
+]
+
+
+def _iter_sitemap_locs(chunks):
+    """Incrementally parse a sitemap / sitemap index fed as an iterable of byte
+    chunks (e.g. a streamed response body), yielding ("sitemap", loc) or ("url", loc)
+    as each entry closes. Chunks are pulled only as needed and elements are cleared
+    as we go, so the caller can stop at any point without the rest being read.
+    Raises xml.etree.ElementTree.ParseError on malformed XML."""
+    import xml.etree.ElementTree as ET
 
-def fetch_sitemap_links(base_url: str, headers: dict) -> list[dict]:
-    """Try to fetch sitemap.xml and extract page URLs. Returns list of {url, label}."""
+    parser = ET.XMLPullParser(events=("end",))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, el in parser.read_events():
+            tag = el.tag.rsplit("}", 1)[-1]
+            if tag in ("sitemap", "url"):
+                loc = next((c.text for c in el if c.tag.rsplit("}", 1)[-1] == "loc"), None)
+                if loc and loc.strip():
+                    yield tag, loc.strip()
+                el.clear()
+
+
+def fetch_sitemap_links(base_url: str, headers: dict | None = None, want: int = 20) -> list[dict]:
+    """Try to fetch sitemap.xml and extract page URLs. Returns list of {url, label}.
+
+    robots.txt and the default candidates are fetched concurrently and the first
+    sitemap that yields URLs wins; a sitemap index fans out to up to 4 sub-sitemaps
+    in parallel. Each document is streamed into the parser (up to SITEMAP_MAX_BYTES)
+    and the download stops once `want` priority URLs have been seen. Documents read
+    to the end go into the HTTP cache like other scraped pages."""
+    import http_cache
     from urllib.parse import urlparse
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
     import xml.etree.ElementTree as ET
 
     base_parsed = urlparse(base_url)
@@ -43,88 +89,123 @@ def fetch_sitemap_links(base_url: str, headers: dict) -> list[dict]:
     base_domain_norm = norm(base_parsed.netloc)
     base_path        = base_parsed.path.rstrip("/")
 
-    # Start with candidates; prepend any Sitemap: line from robots.txt
-    candidates = [f"{base}/sitemap.xml", f"{base}/sitemap_index.xml"]
-    try:
-        rb = requests.get(f"{base}/robots.txt", headers=headers, timeout=5)
-        if rb.ok:
-            for line in rb.text.splitlines():
-                if line.lower().startswith("sitemap:"):
-                    sm_url = line.split(":", 1)[1].strip()
-                    if sm_url not in candidates:
-                        candidates.insert(0, sm_url)
-    except Exception:
-        pass
-
-    ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-    raw_urls = []
+    def is_priority(u: str) -> bool:
+        parsed = urlparse(u)
+        if norm(parsed.netloc) != base_domain_norm:
+            return False
+        combined = (parsed.path + " " + parsed.query).lower()
+        return (not any(kw in combined for kw in _SITEMAP_SKIP)
+                and any(kw in combined for kw in _SITEMAP_IMPORTANT))
 
-    for sitemap_url in candidates:
+    def robots_sitemaps() -> list[str]:
+        found = []
+        try:
+            rb = http_client.get(f"{base}/robots.txt", headers=headers, timeout=5, cache=True)
+            if rb.ok:
+                for line in rb.text.splitlines():
+                    if line.lower().startswith("sitemap:"):
+                        found.append(line.split(":", 1)[1].strip())
+        except Exception:
+            pass
+        return found
+
+    def scan(sitemap_url: str, nested: bool = False) -> list[str]:
+        """Page URLs from one sitemap (following an index one level down)."""
+        print(f"[scrape] Trying sitemap: {sitemap_url}")
+        cached = http_cache.lookup(sitemap_url) if http_cache.ENABLED else None
+        if cached and http_cache.is_fresh(cached[0]):
+            http_cache.record("hits")
+            resp, ok, source = None, True, [cached[1]]
+        else:
+            resp = http_client.get(sitemap_url, headers=headers, timeout=8, stream=True)
+            ok, source = resp.ok, resp.iter_content(65536)
+
+        received, read = [], {"bytes": 0, "truncated": False, "complete": False}
+
+        def chunks():
+            # Pulled by the parser one chunk at a time, capped at SITEMAP_MAX_BYTES
+            for chunk in source:
+                room = SITEMAP_MAX_BYTES - read["bytes"]
+                if len(chunk) >= room:
+                    chunk, read["truncated"] = chunk[:room], True
+                read["bytes"] += len(chunk)
+                received.append(chunk)
+                yield chunk
+                if read["truncated"]:
+                    return
+            read["complete"] = True
+
+        urls, sub_maps, n_priority = [], [], 0
         try:
-            print(f"[scrape] Trying sitemap: {sitemap_url}")
-            resp = requests.get(sitemap_url, headers=headers, timeout=8)
-            print(f"[scrape] Sitemap response: {resp.status_code} ({len(resp.text)} chars)")
-            if not resp.ok or "<" not in resp.text:
-                continue
+            if not ok:
+                print(f"[scrape] Sitemap response: {resp.status_code}")
+                return []
             try:
-                root = ET.fromstring(resp.text)
-            except ET.ParseError as xml_err:
-                print(f"[scrape] Sitemap XML broken ({xml_err}) — trying regex fallback")
-                loc_urls = re.findall(r'<loc>\s*(https?://[^\s<]+)\s*</loc>', resp.text)
-                print(f"[scrape] Regex fallback found {len(loc_urls)} URLs")
-                raw_urls.extend(loc_urls)
-                if raw_urls:
-                    break
-                continue
-
-            # Sitemap index → recurse into sub-sitemaps
-            sub_maps = _xml_locs(root, "sm:sitemap/sm:loc", "sitemap/loc", ns)
-            if sub_maps:
-                print(f"[scrape] Sitemap index with {len(sub_maps)} sub-sitemaps")
-                for loc_el in sub_maps[:4]:
-                    loc_text = loc_el.text
-                    if not loc_text:
+                for kind, loc in _iter_sitemap_locs(chunks()):
+                    if kind == "sitemap":
+                        sub_maps.append(loc)
                         continue
-                    try:
-                        sub = requests.get(loc_text.strip(), headers=headers, timeout=8)
-                        if sub.ok:
-                            sub_root = ET.fromstring(sub.text)
-                            for u in _xml_locs(sub_root, "sm:url/sm:loc", "url/loc", ns):
-                                if u.text:
-                                    raw_urls.append(u.text.strip())
-                    except Exception as e:
-                        print(f"[scrape] Sub-sitemap error: {e}")
-            else:
-                for u in _xml_locs(root, "sm:url/sm:loc", "url/loc", ns):
-                    if u.text:
-                        raw_urls.append(u.text.strip())
-
-            if raw_urls:
-                print(f"[scrape] Sitemap OK: {len(raw_urls)} URLs collected")
-                break
-            else:
-                print(f"[scrape] Sitemap parsed but 0 URLs found (check XML structure)")
+                    urls.append(loc)
+                    if is_priority(loc):
+                        n_priority += 1
+                        if n_priority >= want:
+                            break                # stop reading — the rest is never downloaded
+            except ET.ParseError as xml_err:
+                if not urls and not sub_maps:
+                    print(f"[scrape] Sitemap XML broken ({xml_err}) — trying regex fallback")
+                    for _ in chunks():
+                        pass                     # the regex needs the rest of the (capped) body
+                    text = b"".join(received).decode((resp.encoding if resp else None) or "utf-8",
+                                                     errors="replace")
+                    urls = re.findall(r'<loc>\s*(https?://[^\s<]+)\s*</loc>', text)
+                    print(f"[scrape] Regex fallback found {len(urls)} URLs")
+        finally:
+            if resp is not None:
+                resp.close()
+        state = "complete" if read["complete"] else "truncated" if read["truncated"] else "stopped early"
+        print(f"[scrape] Sitemap read: {read['bytes']:,} bytes ({state}{', cached' if resp is None else ''})")
+        if resp is not None and read["complete"]:
+            http_cache.store(sitemap_url, resp.url, resp.status_code, resp.headers, resp.encoding,
+                             b"".join(received))
+        if sub_maps and not nested:
+            print(f"[scrape] Sitemap index with {len(sub_maps)} sub-sitemaps")
+            with ThreadPoolExecutor(max_workers=SITEMAP_WORKERS) as sub_pool:
+                for sub_urls in sub_pool.map(lambda u: _safe_scan(u, True), sub_maps[:4]):
+                    urls.extend(sub_urls)
+        return urls
+
+    def _safe_scan(sitemap_url: str, nested: bool = False) -> list[str]:
+        try:
+            return scan(sitemap_url, nested)
         except Exception as e:
             print(f"[scrape] Sitemap failed ({sitemap_url}): {e}")
-            continue
+            return []
+
+    # Race robots.txt and the default candidates; robots' Sitemap: lines join the
+    # race as soon as robots.txt arrives. First candidate with URLs wins.
+    raw_urls = []
+    tried = {f"{base}/sitemap.xml", f"{base}/sitemap_index.xml"}
+    pool = ThreadPoolExecutor(max_workers=SITEMAP_WORKERS)
+    try:
+        robots_fut = pool.submit(robots_sitemaps)
+        pending = {pool.submit(_safe_scan, u) for u in tried} | {robots_fut}
+        while pending and not raw_urls:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut is robots_fut:
+                    for sm_url in fut.result():
+                        if sm_url not in tried:
+                            tried.add(sm_url)
+                            pending.add(pool.submit(_safe_scan, sm_url))
+                elif fut.result() and not raw_urls:
+                    raw_urls = fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
     if not raw_urls:
+        print(f"[scrape] No usable sitemap among {len(tried)} candidate(s)")
         return []
-
-    skip = [
-        "impressum", "datenschutz", "privacy", "legal", "agb", "cookie",
-        "login", "register", "cart", "warenkorb", "404", "sitemap",
-        "rss", "feed", "wp-", "admin", "logout", "tag/", "category/",
-        "author/", "/page/", "feed/", "wp-content",
-    ]
-    important = [
-        "about", "uber", "über", "equipe", "team", "uns", "wir",
-        "contact", "kontakt", "service", "leistung", "angebot", "offer",
-        "dienstleistung", "menu", "speise", "karte", "food", "drink",
-        "kueche", "gallery", "galerie", "portfolio", "work", "referenz",
-        "price", "preis", "tarif", "kosten", "paket", "product",
-        "produkt", "shop", "funktion", "feature", "demo", "reserv", "termin",
-    ]
+    print(f"[scrape] Sitemap OK: {len(raw_urls)} URLs collected")
 
     priority = []
     fallback = []
@@ -140,12 +221,12 @@ def fetch_sitemap_links(base_url: str, headers: dict) -> list[dict]:
         if not path or (path == base_path and not parsed.query) or path_key in seen:
             continue
         combined = (path + " " + parsed.query).lower()
-        if any(kw in combined for kw in skip):
+        if any(kw in combined for kw in _SITEMAP_SKIP):
             continue
         seen.add(path_key)
         label = path.split("/")[-1].replace("-", " ").replace("_", " ").title() or parsed.query[:30]
         entry = {"url": u, "label": label}
-        if any(kw in combined for kw in important):
+        if any(kw in combined for kw in _SITEMAP_IMPORTANT):
             priority.append(entry)
         else:
             fallback.append(entry)
@@ -171,9 +252,11 @@ def _clean_label(raw: str) -> str:
     return " ".join(w.capitalize() for w in parts)
 
 
-def find_subpage_links(html: str, base_url: str, max_links: int = 8) -> list[dict]:
+def find_subpage_links(html: str, base_url: str, max_links: int = 8,
+                       index: PageIndex | None = None) -> list[dict]:
     """Find links to important sub-pages. Priority links match known keywords;
-    fallback collects any internal page link so we never return empty-handed."""
+    fallback collects any internal page link so we never return empty-handed.
+    Pass the page's `index` if the caller already built one."""
     from urllib.parse import urljoin, urlparse
 
     def norm(netloc: str) -> str:
@@ -202,18 +285,15 @@ def find_subpage_links(html: str, base_url: str, max_links: int = 8) -> list[dic
         "rss", "feed", "wp-", "admin", "logout",
     ]
 
-    link_re = re.compile(
-        r'<a[^>]+href=["\']([^"\'#][^"\']*)["\'][^>]*>(.*?)</a>',
-        re.DOTALL | re.IGNORECASE,
-    )
-
     priority = []
     fallback = []
     seen     = set()
 
-    for m in link_re.finditer(html):
-        href  = m.group(1).strip()
-        label = re.sub(r"<[^>]+>", "", m.group(2)).strip()
+    for link in (index or build_index(html)).links:
+        href  = link["href"]
+        if href.startswith("#"):
+            continue
+        label = link["label"]
         absolute = urljoin(base_url, href)
         parsed   = urlparse(absolute)
 
@@ -254,62 +334,87 @@ def find_subpage_links(html: str, base_url: str, max_links: int = 8) -> list[dic
     return result
 
 
-def scrape_subpages(base_url: str, homepage_html: str, max_pages: int = 4) -> list[dict]:
-    """Scrape important sub-pages. Returns list of {url, label, html}."""
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
+def scrape_subpages(base_url: str, homepage_html: str, max_pages: int = 4,
+                    max_workers: int = 4, timeout: int = 10, total_budget: int = 30,
+                    homepage_index: PageIndex | None = None) -> list[dict]:
+    """Scrape important sub-pages. Returns list of {url, label, html}.
+
+    Pages are fetched concurrently on a bounded pool (max_workers=1 keeps the old
+    serial behaviour). Each fetch gets `timeout` seconds wall-clock, the whole crawl
+    gets `total_budget` seconds; whatever finished in time is returned in the
+    original link-priority order."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as _Timeout
 
     # Try sitemap first — works even on JS-rendered sites
-    links = fetch_sitemap_links(base_url, headers)
+    links = fetch_sitemap_links(base_url, want=max_pages * 2)
 
     # Fall back to regex parsing of homepage HTML
     if not links:
         print("[scrape] Sitemap returned 0 links — falling back to HTML link parsing")
-        links = find_subpage_links(homepage_html, base_url, max_links=max_pages * 2)
+        links = find_subpage_links(homepage_html, base_url, max_links=max_pages * 2,
+                                   index=homepage_index)
 
     print(f"[scrape] Total links to scrape: {len(links)} (will use first {max_pages})")
+    targets = links[:max_pages]
+    if not targets:
+        return []
 
-    result = []
-    for link in links[:max_pages]:
-        try:
-            print(f"[scrape] Sub-page: {link['url']}")
-            resp = requests.get(link["url"], headers=headers, timeout=10)
-            if resp.ok:
-                result.append({"url": link["url"], "label": link["label"], "html": resp.text})
-                print(f"[scrape] Got '{link['label']}' ({len(resp.text):,} chars)")
-        except Exception as e:
-            print(f"[scrape] Failed {link['url']}: {e}")
+    started  = time.monotonic()
+    deadline = started + total_budget
+
+    def _fetch(link: dict) -> dict | None:
+        print(f"[scrape] Sub-page: {link['url']}")
+        resp = http_client.get(link["url"], timeout=timeout, cache=True,
+                               max_seconds=max(1.0, min(timeout, deadline - time.monotonic())))
+        if not resp.ok:
+            return None
+        text = resp.text
+        print(f"[scrape] Got '{link['label']}' ({len(text):,} chars)")
+        return {"url": link["url"], "label": link["label"], "html": text}
+
+    results = [None] * len(targets)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets))))
+    futures = {pool.submit(_fetch, link): i for i, link in enumerate(targets)}
+    try:
+        for f in as_completed(futures, timeout=total_budget):
+            i = futures[f]
+            try:
+                results[i] = f.result()
+            except Exception as e:
+                print(f"[scrape] Failed {targets[i]['url']}: {e}")
+    except _Timeout:
+        print(f"[scrape] Sub-page budget of {total_budget}s exhausted — keeping finished pages")
+    finally:
+        # Don't block the request on stragglers; queued fetches are dropped.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    result = [r for r in results if r]
+    print(f"[scrape] Sub-pages: {len(result)}/{len(targets)} in {time.monotonic() - started:.1f}s")
     return result
 
 
 def _is_js_rendered(html: str) -> bool:
     """Return True if the page is likely JS-rendered (sparse body text)."""
-    text = re.sub(r'<[^>]+>', ' ', html)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'\s+', ' ', build_index(html).raw_text).strip()
     return len(text) < 1200
 
 
-def scrape(url: str) -> dict:
+def scrape(url: str, overlap_render: bool = RENDER_OVERLAP) -> dict:
     """
-    Fetch HTML from a URL. Falls back to Playwright for JS-rendered sites.
+    Fetch HTML from a URL. Falls back to the rendered DOM for JS-rendered sites.
     Also takes an above-the-fold screenshot for Claude's visual context.
-    Returns dict with html, url, slug, screenshot_path.
+    Both come from ONE browser navigation (see render), which by default starts in
+    parallel with the plain HTTP fetch instead of after it.
+    Returns dict with html, url, final_url, slug, screenshot_path.
     """
+    slug = slugify(url)
+    abort_render = threading.Event()       # set when the site is rejected — frees the browser slot
+    render_fut = render_async(url, slug, abort_render) if overlap_render else None
+
     print(f"[scrape] Fetching {url}")
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
+        resp = http_client.get(url, timeout=15, cache=True)
         if resp.status_code == 403:
             raise ValueError(f"This website blocks automated access (403 Forbidden). Try a different URL.")
         if resp.status_code == 404:
@@ -317,37 +422,40 @@ def scrape(url: str) -> dict:
         resp.raise_for_status()
         html = resp.text
     except ValueError:
+        abort_render.set()
+        if render_fut:
+            render_fut.cancel()
         raise
     except requests.RequestException as e:
+        abort_render.set()
+        if render_fut:
+            render_fut.cancel()
         print(f"[scrape] ERROR: {e}")
         raise ValueError(f"Could not reach the website: {e}")
 
-    slug = slugify(url)
-    screenshot_path = None
+    if render_fut is None:
+        render_fut = render_async(url, slug, abort_render)
+    rendered = _await_render(render_fut, url, abort_render)
+    screenshot_path = rendered["screenshot_path"] if rendered else None
+    final_url = rendered["final_url"] if rendered else resp.url
 
-    # JS-rendered site detection — if sparse, try Playwright for real HTML + screenshot
+    # JS-rendered site detection — if sparse, use the browser's DOM instead
     if _is_js_rendered(html):
-        print(f"[scrape] Page appears JS-rendered ({len(html)} chars raw) — trying Playwright")
-        pw_result = scrape_with_playwright(url, slug)
-        if pw_result:
-            html = pw_result["html"]
-            screenshot_path = pw_result["screenshot_path"]
-            print(f"[scrape] Playwright HTML: {len(html):,} chars")
+        if rendered and rendered["html"]:
+            print(f"[scrape] Page appears JS-rendered ({len(html)} chars raw) — using rendered DOM ({len(rendered['html']):,} chars)")
+            html = rendered["html"]
         else:
-            # Playwright not available or failed — still try a screenshot separately
-            screenshot_path = screenshot(url, slug)
-    else:
-        # Normal page — just take a screenshot for visual context
-        screenshot_path = screenshot(url, slug)
+            print(f"[scrape] Page appears JS-rendered ({len(html)} chars raw) — no rendered DOM available")
 
     html_path = TMP / f"{slug}.html"
     html_path.write_text(html, encoding="utf-8")
     print(f"[scrape] Saved HTML → {html_path} ({len(html)} chars)")
 
-    return {"url": url, "slug": slug, "html": html, "html_path": str(html_path), "screenshot_path": screenshot_path}
+    return {"url": url, "final_url": final_url, "slug": slug, "html": html,
+            "html_path": str(html_path), "screenshot_path": screenshot_path}
 
 
-def extract_important_links(html: str, base_url: str) -> list[dict]:
+def extract_important_links(html: str, base_url: str, index: PageIndex | None = None) -> list[dict]:
     """Extract important external links (maps, social, booking, phone, email, PDF) from HTML."""
     from urllib.parse import urljoin
 
@@ -371,10 +479,12 @@ def extract_important_links(html: str, base_url: str) -> list[dict]:
     seen  = set()
     links = []
 
+    idx = index or build_index(html)
+
     # 1. Extract from <a href="..."> tags
-    for m in re.finditer(r'<a\s[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>', html, re.DOTALL | re.IGNORECASE):
-        raw  = m.group(1).strip()
-        text = re.sub(r"<[^>]+>", "", m.group(2)).strip()[:80]
+    for link in idx.links:
+        raw  = link["href"]
+        text = link["label"][:80]
 
         if raw.startswith(("javascript:", "#")):
             continue
@@ -391,7 +501,7 @@ def extract_important_links(html: str, base_url: str) -> list[dict]:
 
     # 2. Extract plain-text phone numbers (not already found as tel: links)
     found_phones = {l["href"].replace("tel:", "").replace(" ", "").replace("-", "") for l in links if l["category"] == "phone"}
-    plain_text = re.sub(r"<[^>]+>", " ", html)
+    plain_text = idx.raw_text
     for m in re.finditer(r'(\+\d{1,3}[\s\-]?\d{2,3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}|\b0\d{2}[\s\-]\d{3}[\s\-]\d{2}[\s\-]\d{2})', plain_text):
         raw_phone = m.group(1).strip()
         normalized = re.sub(r"[\s\-]", "", raw_phone)
@@ -416,68 +526,73 @@ def extract_important_links(html: str, base_url: str) -> list[dict]:
     return links
 
 
-def screenshot(url: str, slug: str) -> str | None:
+def render_async(url: str, slug: str, abort=None):
     """
-    Take an above-the-fold viewport screenshot with Playwright.
-    Also returns the rendered HTML if the original scrape was JS-sparse.
-    Returns path or None on failure.
+    Queue ONE browser navigation on the shared pool that captures the rendered DOM,
+    an above-the-fold screenshot and the final URL after redirects.
+    Returns a Future resolving to {html, screenshot_path, final_url}, or None if
+    Playwright is not installed. Setting `abort` (threading.Event) stops a render
+    that has already started at its next stage; Future.cancel() only drops a
+    queued one.
     """
-    try:
-        from playwright.sync_api import sync_playwright
-    except ImportError:
-        print("[screenshot] Playwright not installed — skipping screenshot.")
+    from browser_pool import get_pool, goto_and_settle, check_abort, VIEWPORT
+
+    pool = get_pool()
+    if pool is None:
+        print("[render] Playwright not installed — skipping render/screenshot.")
         print("  Install: pip install playwright && playwright install chromium")
         return None
 
     screenshot_path = TMP / f"{slug}.png"
-    print(f"[screenshot] Taking screenshot of {url}")
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
-            page = browser.new_page(viewport={"width": 1280, "height": 800})
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            # Above-the-fold only — fast, token-efficient, captures brand identity
-            page.screenshot(path=str(screenshot_path), full_page=False, clip={"x": 0, "y": 0, "width": 1280, "height": 800})
-            browser.close()
-        print(f"[screenshot] Saved → {screenshot_path}")
-        return str(screenshot_path)
-    except Exception as e:
-        print(f"[screenshot] Failed: {e}")
-        return None
+    print(f"[render] Queued render of {url}")
 
+    def _job(page):
+        goto_and_settle(page, url, abort=abort)
+        html = page.content()
+        check_abort(abort, url)
+        # Above-the-fold only — fast, token-efficient, captures brand identity
+        page.screenshot(path=str(screenshot_path), full_page=False, clip={"x": 0, "y": 0, **VIEWPORT})
+        return {"html": html, "screenshot_path": str(screenshot_path), "final_url": page.url}
 
-def scrape_with_playwright(url: str, slug: str) -> dict | None:
-    """
-    Render a JS-heavy page with Playwright and return its HTML + a screenshot.
-    Used as fallback when requests returns a sparse page.
-    """
-    try:
-        from playwright.sync_api import sync_playwright
-    except ImportError:
-        return None
+    return pool.submit(_job)
 
-    screenshot_path = TMP / f"{slug}.png"
-    print(f"[playwright] Rendering JS page: {url}")
+
+def _await_render(fut, url: str, abort=None) -> dict | None:
+    if fut is None:
+        return None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
-            page = browser.new_page(viewport={"width": 1280, "height": 800})
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            html = page.content()
-            page.screenshot(path=str(screenshot_path), full_page=False, clip={"x": 0, "y": 0, "width": 1280, "height": 800})
-            browser.close()
-        print(f"[playwright] Got {len(html):,} chars of rendered HTML")
-        return {"html": html, "screenshot_path": str(screenshot_path)}
+        result = fut.result(timeout=RENDER_TIMEOUT)
+        print(f"[render] ✓ {url} → {result['final_url']} ({len(result['html']):,} chars, screenshot {result['screenshot_path']})")
+        return result
     except Exception as e:
-        print(f"[playwright] Failed: {e}")
+        fut.cancel()
+        if abort is not None:
+            abort.set()                  # timed out mid-render — stop it at its next stage
+        print(f"[render] Failed: {e or type(e).__name__}")
         return None
 
 
+def render(url: str, slug: str) -> dict | None:
+    """Blocking single-pass render. Returns {html, screenshot_path, final_url} or None."""
+    abort = threading.Event()
+    return _await_render(render_async(url, slug, abort), url, abort)
+
+
+def screenshot(url: str, slug: str) -> str | None:
+    """Above-the-fold screenshot only (thin wrapper around render). Path or None."""
+    result = render(url, slug)
+    return result["screenshot_path"] if result else None
+
+
+def scrape_with_playwright(url: str, slug: str) -> dict | None:
+    """Rendered HTML + screenshot (thin wrapper around render)."""
+    return render(url, slug)
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python scrape_site.py <url>")
         sys.exit(1)
     url = sys.argv[1]
     result = scrape(url)
-    screenshot(url, result["slug"])
     print("\nDone.")
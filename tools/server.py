@@ -7,7 +7,8 @@ Endpoints:
     POST /auth/register           → {"token": "...", "user": {...}}
     POST /auth/login              → {"token": "...", "user": {...}}
     GET  /auth/me                 → {"id": "...", "email": "...", "tokens": n}
-    POST /generate                → {"generation_id": "...", "hero_html": "...", "business_name": "..."}
+    POST /generate                → 202 {"generation_id": "...", "status": "generating"}
+    GET  /status/<generation_id>  → {"status": "generating" | "hero_ready" | "done" | "error", ...}
     POST /unlock                  → {"html": "...", "slug": "..."}
     POST /checkout                → {"checkout_url": "..."}
     POST /checkout/verify         → {"tokens_added": n, "new_balance": n}
@@ -63,30 +64,34 @@ from auth import (
     create_token, get_current_user_id, require_auth,
 )
 import db
+import job_queue
+import checkpoints
+import artifact_store
+import http_client
+import http_cache
+import image_store
 from generate_website import (
     analyze_website, generate_website, generate_hero_only,
     load_reference_images, extract_image_urls, extract_text_content,
     validate_image_urls, download_site_images_for_claude, TEST_MODE,
     fetch_pexels_images, _industry_to_pexels_query, extract_logo_url,
-    factcheck_pass, inline_remote_images,
+    factcheck_pass,
+    fetch_delivery_images, rewrite_image_urls, data_uri_map, responsive_bundle, picture_rewrite,
+    image_placeholders, stamp_image_attrs,
 )
 from scrape_site import scrape, scrape_subpages, extract_important_links, slugify
+from html_index import build_index
 
 def _load_screenshot(path: str | None) -> dict | None:
     """Load a screenshot PNG from disk and return a base64-encoded vision dict."""
     if not path:
         return None
     try:
-        from PIL import Image as _Img
-        import io as _io
-        img = _Img.open(path).convert("RGB")
+        import image_pool
         # Cap at 1280px wide to keep token cost reasonable
-        if img.width > 1280:
-            img.thumbnail((1280, 800), _Img.LANCZOS)
-        buf = _io.BytesIO()
-        img.save(buf, format="JPEG", quality=80)
-        data = _b64.standard_b64encode(buf.getvalue()).decode()
-        print(f"[screenshot] Encoded for Claude: {len(buf.getvalue())//1024}KB")
+        jpeg = image_pool.transcode_file(path, max_size=(1280, 800), fmt="JPEG", quality=80)
+        data = _b64.standard_b64encode(jpeg).decode()
+        print(f"[screenshot] Encoded for Claude: {len(jpeg)//1024}KB")
         return {"data": data, "media_type": "image/jpeg"}
     except Exception as e:
         print(f"[screenshot] Could not load screenshot: {e}")
@@ -99,9 +104,18 @@ _N_REF_IMAGES  = 2 if TEST_MODE else 4   # reference design screenshots
 _N_SITE_IMAGES = 3 if TEST_MODE else 6   # customer site images
 print(f"[server] TEST_MODE={'ON' if TEST_MODE else 'OFF'} | ref_images={_N_REF_IMAGES} | site_images={_N_SITE_IMAGES}")
 
+# Load (or build, if the deploy step didn't) the pre-encoded reference designs once
+# per worker, off the request path
+import reference_cache
+import threading as _threading
+_threading.Thread(target=reference_cache.get, name="reference-cache", daemon=True).start()
+
 TMP = ROOT / ".tmp"
 TMP.mkdir(exist_ok=True)
 
+# "assets" = images shipped as real files under assets/ in the ZIP; "inline" = base64 data URIs
+PACKAGE_MODE = os.environ.get("PACKAGE_MODE", "assets").lower()
+
 # ── Token packages ────────────────────────────────────────────────────────────
 PACKAGES = {
     "test": {"tokens": 1,  "amount_chf": 19.90, "price_id": os.environ.get("STRIPE_PRICE_TEST")},
@@ -339,12 +353,22 @@ main.subpage-main img.sp-img,main.subpage-main img{max-width:100%;height:auto;ob
 
     return files
 
+# Already-compressed formats gain nothing from DEFLATE — store them as-is
+_STORED_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif")
+
+
 def create_zip(files: dict) -> bytes:
-    """Package {filename: html} dict into a ZIP archive."""
+    """Package {filename: html | bytes} dict into a ZIP archive.
+    Text is deflated; compressed image files (bytes) are stored without recompression."""
     buf = io.BytesIO()
     with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for name, html in files.items():
-            zf.writestr(name, html.encode("utf-8"))
+        for name, content in files.items():
+            if isinstance(content, str):
+                zf.writestr(name, content.encode("utf-8"))
+            elif name.lower().endswith(_STORED_EXTS):
+                zf.writestr(name, content, compress_type=zipfile.ZIP_STORED)
+            else:
+                zf.writestr(name, content)
     return buf.getvalue()
 
 def extract_hero_html(full_html: str) -> str:
@@ -464,151 +488,206 @@ def generate():
     # Optional: attach generation to logged-in user
     user_id = get_current_user_id()
 
-    try:
-        print(f"\n[server] Generating for: {url}")
+    # Create the generation row and hand the whole pipeline (scrape → analysis →
+    # hero + full site) to the job queue — the worker is free again at once and
+    # the frontend polls /status for "hero_ready" and then "done".
+    generation = db.save_generation(user_id, url, slugify(url), "", "")
+    job_queue.enqueue("generate", {"generation_id": generation["id"], "url": url},
+                      ref=generation["id"], job_id=f"{generation['id']}:generate")
+    print(f"[server] Generation {generation['id']} queued for {url}")
+    return jsonify({"generation_id": generation["id"], "status": "generating"}), 202
+
+
+def _job_failed(error: str, generation_id: str, **_) -> None:
+    """on_give_up hook of both generation jobs: surface the error through /status,
+    unless the site already finished (e.g. only the package stage kept failing)."""
+    if (db.get_generation_status(generation_id) or {}).get("status") in db.ACTIVE_STATUSES:
+        db.update_generation_status(generation_id, "error", error=error)   # a waiting full-site job stops too
+
+
+def _stage(generation_id: str, stage: str, compute):
+    """checkpoints.run_stage that also records the stage being worked on (→ /status)."""
+    def _run():
+        db.update_generation_status(generation_id, stage=stage)
+        return compute()
+    return checkpoints.run_stage(generation_id, stage, _run)
+
+
+def _scrape_stage(url: str) -> dict:
+    """Homepage + sub-pages → text, pages, links, validated images, screenshot, logo."""
+    scraped   = scrape(url)
+    home_idx  = build_index(scraped["html"])
+    subpages  = scrape_subpages(url, scraped["html"], max_pages=10, homepage_index=home_idx)
+    # One index per page, built once and shared by the extractors below; they go
+    # out of scope with this stage instead of sitting in a module-level cache
+    sub_idx   = [build_index(sp["html"]) for sp in subpages]
+
+    # Collect images from homepage + all sub-pages
+    site_images = extract_image_urls(scraped["html"], url, index=home_idx)
+    for sp, idx in zip(subpages, sub_idx):
+        for img in extract_image_urls(sp["html"], sp["url"], max_images=6, index=idx):
+            if img not in site_images:
+                site_images.append(img)
+    site_images = site_images[:20]  # collect more before filtering
+
+    # Validate image dimensions — remove tiny/broken images, sort largest first
+    site_images = validate_image_urls(site_images, min_dim=350)
+    site_images = site_images[:15]  # keep best 15 after filtering
+
+    # Build structured pages list: homepage + each sub-page
+    import re as _re
+    def _make_id(label: str) -> str:
+        return _re.sub(r"[^a-z0-9]+", "-", label.lower()).strip("-")
+
+    homepage_text = extract_text_content(scraped["html"], max_chars=12000, index=home_idx)
+    pages = [{"label": "Homepage", "id": "home", "text": homepage_text}]
+    full_text_parts = [homepage_text]
+    for sp, idx in zip(subpages, sub_idx):
+        sp_text = extract_text_content(sp["html"], max_chars=10000, index=idx)
+        label   = sp["label"]
+        pages.append({"label": label, "id": _make_id(label), "text": sp_text})
+        full_text_parts.append(f"--- PAGE: {label.upper()} ---\n{sp_text}")
+
+    full_text = "\n\n".join(full_text_parts)
+    print(f"[server] Pages: {[p['label'] for p in pages]} | Total text: {len(full_text):,} chars")
+
+    # Collect important links from homepage + all subpages
+    seen_hrefs = set()
+    important_links = []
+    sources = [(scraped["html"], url, home_idx)]
+    sources += [(sp["html"], sp["url"], idx) for sp, idx in zip(subpages, sub_idx)]
+    for html_source, source_url, idx in sources:
+        for lnk in extract_important_links(html_source, source_url, index=idx):
+            if lnk["href"] not in seen_hrefs:
+                seen_hrefs.add(lnk["href"])
+                important_links.append(lnk)
+    print(f"[server] Important links found: {len(important_links)} — {[l['category'] for l in important_links]}")
+
+    # Extract logo from original site
+    logo_url = extract_logo_url(scraped["html"], url, index=home_idx)
+    print(f"[server] Logo URL: {logo_url or 'not found'}")
+
+    return {
+        "slug":            scraped["slug"],
+        "html":            scraped["html"],
+        "site_images":     site_images,
+        "pages":           pages,
+        "full_text":       full_text,
+        "important_links": important_links,
+        "screenshot_data": _load_screenshot(scraped.get("screenshot_path")),   # Claude's visual context
+        "logo_url":        logo_url,
+    }
 
-        try:
-            scraped = scrape(url)
-        except ValueError as scrape_err:
-            return jsonify({"error": str(scrape_err)}), 422
-        slug      = scraped["slug"]
-        subpages  = scrape_subpages(url, scraped["html"], max_pages=10)
-
-        # references loaded after analysis so we can pass industry
-        references = None  # filled after analysis below
-
-        # Collect images from homepage + all sub-pages
-        site_images = extract_image_urls(scraped["html"], url)
-        for sp in subpages:
-            for img in extract_image_urls(sp["html"], sp["url"], max_images=6):
-                if img not in site_images:
-                    site_images.append(img)
-        site_images = site_images[:20]  # collect more before filtering
-
-        # Validate image dimensions — remove tiny/broken images, sort largest first
-        site_images = validate_image_urls(site_images, min_dim=350)
-        site_images = site_images[:15]  # keep best 15 after filtering
-
-        # Build structured pages list: homepage + each sub-page
-        import re as _re
-        def _make_id(label: str) -> str:
-            return _re.sub(r"[^a-z0-9]+", "-", label.lower()).strip("-")
-
-        homepage_text = extract_text_content(scraped["html"], max_chars=12000)
-        pages = [{"label": "Homepage", "id": "home", "text": homepage_text}]
-        full_text_parts = [homepage_text]
-        for sp in subpages:
-            sp_text = extract_text_content(sp["html"], max_chars=10000)
-            label   = sp["label"]
-            pages.append({"label": label, "id": _make_id(label), "text": sp_text})
-            full_text_parts.append(f"--- PAGE: {label.upper()} ---\n{sp_text}")
-
-        full_text = "\n\n".join(full_text_parts)
-        print(f"[server] Pages: {[p['label'] for p in pages]} | Total text: {len(full_text):,} chars")
-
-        # Collect important links from homepage + all subpages
-        seen_hrefs = set()
-        important_links = []
-        for html_source, source_url in [(scraped["html"], url)] + [(sp["html"], sp["url"]) for sp in subpages]:
-            for lnk in extract_important_links(html_source, source_url):
-                if lnk["href"] not in seen_hrefs:
-                    seen_hrefs.add(lnk["href"])
-                    important_links.append(lnk)
-        print(f"[server] Important links found: {len(important_links)} — {[l['category'] for l in important_links]}")
-
-        # Use cached analysis if available
-        analysis_path = TMP / f"{slug}_analysis.json"
-        if analysis_path.exists():
-            analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
-            # If cached analysis lacks pages_content (old format), re-analyze
-            if not analysis.get("pages_content"):
-                print("[analyze] Cached analysis missing pages_content — re-analyzing")
-                analysis_path.unlink()
-        # Load screenshot for Claude's visual context
-        screenshot_data = _load_screenshot(scraped.get("screenshot_path"))
-
-        if not analysis_path.exists():
-            analysis = analyze_website(url, scraped["html"], "", full_text, pages, screenshot_data=screenshot_data)
-            analysis_path.write_text(
-                json.dumps(analysis, indent=2, ensure_ascii=False), encoding="utf-8"
-            )
 
-        # Now that we have industry from analysis, load matched reference designs
-        _industry = analysis.get("industry", "")
-        references = load_reference_images(n=_N_REF_IMAGES, industry=_industry)
-
-        # If the scraped site has too few usable images, add industry-matched Pexels
-        # stock photos as candidates. The generator only uses one if it is genuinely
-        # good (the "perfect photo or none" rule) — otherwise it builds a graphic/
-        # typographic hero rather than forcing a weak photo.
-        if len(site_images) < 3:
-            try:
-                _pq = _industry_to_pexels_query(_industry, analysis.get("business_name", ""))
-                _stock = fetch_pexels_images(_pq, n=6)
-                for _u in _stock:
-                    if _u not in site_images:
-                        site_images.append(_u)
-                print(f"[server] Few site images ({len(site_images)} total) — added Pexels candidates for '{_pq}'")
-            except Exception as _e:
-                print(f"[server] Pexels fallback skipped: {_e}")
-
-        # Download actual site images so Claude can SEE and visually select them
-        site_images_data = download_site_images_for_claude(site_images, max_images=_N_SITE_IMAGES)
-
-        # Extract logo from original site
-        logo_url = extract_logo_url(scraped["html"], url)
-        print(f"[server] Logo URL: {logo_url or 'not found'}")
-
-        # Generate hero first (fast ~30s) — gives immediate visual feedback
-        hero_html_full = generate_hero_only(analysis, references, site_images, raw_html=scraped["html"], site_images_data=site_images_data, logo_url=logo_url, screenshot_data=screenshot_data)
-
-        safety_css = _build_safety_css()
-        hero_html_full = hero_html_full.replace('</head>', safety_css + '\n</head>', 1)
-        hero_html_full = _fix_nav_contrast(hero_html_full)
-        hero_html = extract_hero_html(hero_html_full)
-
-        # Build full-site context
-        ctx = {
-            "url":             url,
-            "slug":            slug,
-            "site_images":     site_images,
-            "important_links": important_links,
-            "pages":           pages,
-            "full_text":       full_text,
-            "analysis":        analysis,
-            "raw_html":        scraped["html"][:200_000],
-            "hero_html_full":  hero_html_full,
-            "screenshot_data": screenshot_data,
-        }
-
-        # Save generation — mark as generating immediately (no token required)
-        import time as _time
-        generation = db.save_generation(user_id, url, slug, hero_html,
-                                        f"##GENERATING##:{int(_time.time())}")
-
-        # Start full generation in background immediately — no paywall
-        _threading.Thread(target=_build_full_site, args=(generation["id"], ctx), daemon=True).start()
-        print(f"[server] Full-site background job started for {generation['id']}")
-
-        # Determine form type for UI prompt
-        _ind = analysis.get("industry", "").lower()
-        _has_booking = any(l.get("category") == "booking" for l in important_links)
-        _res_kw = ["restaurant","pizzeria","trattoria","bistro","café","cafe",
-                   "bäckerei","bakery","catering","gastro","hotel","bar ","diner","sushi","burger"]
-        _is_res = any(k in _ind for k in _res_kw) and not _has_booking
-
-        print(f"[server] Done — generation {generation['id']}")
-        return jsonify({
-            "generation_id": generation["id"],
-            "hero_html":     hero_html,
+def _analysis_stage(url: str, site: dict) -> dict:
+    # Use cached analysis if available
+    analysis_path = TMP / f"{site['slug']}_analysis.json"
+    if analysis_path.exists():
+        analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
+        # If cached analysis lacks pages_content (old format), re-analyze
+        if analysis.get("pages_content"):
+            return analysis
+        print("[analyze] Cached analysis missing pages_content — re-analyzing")
+    analysis = analyze_website(url, site["html"], "", site["full_text"], site["pages"],
+                               screenshot_data=site["screenshot_data"])
+    analysis_path.write_text(json.dumps(analysis, indent=2, ensure_ascii=False), encoding="utf-8")
+    return analysis
+
+
+def _image_stage(site_images: list, analysis: dict) -> list:
+    # If the scraped site has too few usable images, add industry-matched Pexels
+    # stock photos as candidates. The generator only uses one if it is genuinely
+    # good (the "perfect photo or none" rule) — otherwise it builds a graphic/
+    # typographic hero rather than forcing a weak photo.
+    site_images = list(site_images)
+    if len(site_images) < 3:
+        try:
+            _pq = _industry_to_pexels_query(analysis.get("industry", ""), analysis.get("business_name", ""))
+            _stock = fetch_pexels_images(_pq, n=6)
+            for _u in _stock:
+                if _u not in site_images:
+                    site_images.append(_u)
+            print(f"[server] Few site images ({len(site_images)} total) — added Pexels candidates for '{_pq}'")
+        except Exception as _e:
+            print(f"[server] Pexels fallback skipped: {_e}")
+    return site_images
+
+
+def _hero_stage(analysis: dict, site: dict, site_images: list, net_since: dict) -> dict:
+    # Now that we have industry from analysis, load matched reference designs
+    references = load_reference_images(n=_N_REF_IMAGES, industry=analysis.get("industry", ""))
+
+    # Download actual site images so Claude can SEE and visually select them
+    site_images_data = download_site_images_for_claude(site_images, max_images=_N_SITE_IMAGES)
+    http_client.log_stats("server", since=net_since["http"])
+    http_cache.log_stats("server", since=net_since["cache"])
+    image_store.log_stats("server", since=net_since["images"])
+
+    hero_html_full = generate_hero_only(analysis, references, site_images, raw_html=site["html"], site_images_data=site_images_data, logo_url=site["logo_url"], screenshot_data=site["screenshot_data"])
+    safety_css = _build_safety_css()
+    hero_html_full = hero_html_full.replace('</head>', safety_css + '\n</head>', 1)
+    hero_html_full = _fix_nav_contrast(hero_html_full)
+
+    # Determine form type for UI prompt
+    _ind = analysis.get("industry", "").lower()
+    _has_booking = any(l.get("category") == "booking" for l in site["important_links"])
+    _res_kw = ["restaurant","pizzeria","trattoria","bistro","café","cafe",
+               "bäckerei","bakery","catering","gastro","hotel","bar ","diner","sushi","burger"]
+    _is_res = any(k in _ind for k in _res_kw) and not _has_booking
+    return {
+        "hero_html": extract_hero_html(hero_html_full),
+        "meta": {
             "business_name": analysis.get("business_name", ""),
             "has_form":      True,
             "form_type":     "reservation" if _is_res else "contact",
-        })
+        },
+    }
 
-    except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"error": str(exc)}), 500
+
+@job_queue.handler("generate", on_give_up=_job_failed)
+def _run_generation(generation_id: str, url: str) -> None:
+    """Queued job behind /generate: scrape, analyse, then hero preview and full
+    site in parallel. The hero lands in hero_html (→ /status "hero_ready").
+    Every stage is checkpointed, so a retry resumes after the last one finished."""
+    print(f"\n[server] Generating for: {url}")
+    net_since = {"http": http_client.stats(), "cache": http_cache.stats(), "images": image_store.stats()}     # this job's network counters are logged as deltas
+    if (db.get_generation_status(generation_id) or {}).get("status") == "queued":
+        db.update_generation_status(generation_id, "generating")
+
+    try:
+        site = _stage(generation_id, "scrape", lambda: _scrape_stage(url))
+    except ValueError as scrape_err:
+        db.update_generation_status(generation_id, "error", error=str(scrape_err))   # unusable site — no retry
+        return
+    analysis    = _stage(generation_id, "analysis", lambda: _analysis_stage(url, site))
+    site_images = _stage(generation_id, "images", lambda: _image_stage(site["site_images"], analysis))
+
+    # Build full-site context. The full site only needs the hero for the final
+    # splice, so it is queued now and waits for hero_html at the very end.
+    ctx = {
+        "url":             url,
+        "slug":            site["slug"],
+        "site_images":     site_images,
+        "important_links": site["important_links"],
+        "pages":           site["pages"],
+        "full_text":       site["full_text"],
+        "analysis":        analysis,
+        "raw_html":        site["html"][:200_000],
+        "hero_pending":    True,
+        "screenshot_data": site["screenshot_data"],
+    }
+    job_queue.enqueue("full_site", {"generation_id": generation_id, "ctx": ctx},
+                      ref=generation_id, job_id=f"{generation_id}:full_site")
+
+    # Hero in parallel (fast ~30s) — gives immediate visual feedback
+    hero = _stage(generation_id, "hero", lambda: _hero_stage(analysis, site, site_images, net_since))
+
+    # Hero and hero_ready status in ONE write: the full-site job waits for it, so its
+    # final "done" can never be overwritten by this one (a resumed job that already
+    # stored the hero skips it).
+    if (db.get_generation_status(generation_id) or {}).get("status") in ("queued", "generating"):
+        db.update_hero_html(generation_id, hero["hero_html"], hero["meta"])
+    print(f"[server] Hero ready — generation {generation_id}")
 
 
 # ── Generate from scratch (no URL) ───────────────────────────────────────────
@@ -618,28 +697,93 @@ def generate():
 
 # ── Unlock (async) ───────────────────────────────────────────────────────────
 
-import threading as _threading
+HERO_WAIT_SECONDS = 300
+
 
+def _await_hero(generation_id: str, ctx: dict) -> str:
+    """Hero HTML for the splice: stored in ctx (legacy pending jobs) or being
+    generated in parallel by the "generate" job, which writes it to hero_html.
+    Raises if that job failed or the hero doesn't arrive in time."""
+    if ctx.get("hero_html_full"):
+        return ctx["hero_html_full"]
+    if not ctx.get("hero_pending"):
+        return ""
+    import time as _time
+    deadline = _time.monotonic() + HERO_WAIT_SECONDS
+    waited = False
+    while True:
+        generation = db.get_generation_status(generation_id) or {}
+        if generation.get("status") in ("hero_ready", "done"):
+            return db.get_generation_field(generation_id, "hero_html") or ""
+        if generation.get("status") == "error":
+            raise RuntimeError(generation.get("error") or "Hero preview failed")
+        if _time.monotonic() > deadline:
+            raise TimeoutError("Hero preview did not finish")
+        if not waited:
+            print("[unlock] Full site ready — waiting for hero preview")
+            waited = True
+        _time.sleep(3)
+
+
+def _splice_and_finish(generation_id: str, ctx: dict, full_html: str) -> str:
+    # ── Reuse the existing hero so it matches the preview exactly ──────────
+    hero_html_full = _await_hero(generation_id, ctx)
+    hero_marker    = "<!-- HERO_END -->"
+    if hero_html_full and hero_marker in hero_html_full and hero_marker in full_html:
+        import re as _re_hero
+        hero_styles = "\n".join(
+            m.group(0) for m in _re_hero.finditer(r'<style[^>]*>.*?</style>', hero_html_full, _re_hero.DOTALL)
+        )
+        hero_body_start   = hero_html_full.find("<body")
+        hero_body_tag_end = hero_html_full.find(">", hero_body_start) + 1
+        hero_end_idx      = hero_html_full.index(hero_marker) + len(hero_marker)
+        preserved_body    = hero_html_full[hero_body_tag_end:hero_end_idx]
+        if hero_styles:
+            full_html = full_html.replace("</head>", hero_styles + "\n</head>", 1)
+        full_body_start   = full_html.find("<body")
+        full_body_tag_end = full_html.find(">", full_body_start) + 1
+        full_hero_end     = full_html.index(hero_marker) + len(hero_marker)
+        full_html = full_html[:full_body_tag_end] + preserved_body + full_html[full_hero_end:]
+        print("[unlock] ✓ Reused hero preview")
+
+    # Apply safety CSS + watermark
+    full_html = full_html.replace('</head>', _build_safety_css() + '\n</head>', 1)
+    full_html = _fix_nav_contrast(full_html)
+    watermark = (
+        '<div style="text-align:center;padding:18px 20px;font-size:11px;'
+        'color:rgba(150,150,150,0.7);font-family:sans-serif;letter-spacing:0.3px;'
+        'border-top:1px solid rgba(150,150,150,0.15);margin-top:0;">'
+        'Website made with '
+        '<a href="https://webisterevive.xyz" target="_blank" '
+        'style="color:inherit;text-decoration:underline;">WebsiteRevive</a>'
+        '</div>'
+    )
+    return full_html.replace('</body>', watermark + '\n</body>')
+
+
+@job_queue.handler("full_site", on_give_up=_job_failed)
 def _build_full_site(generation_id: str, ctx: dict) -> None:
-    """Background thread: generate full site HTML and save to DB."""
-    try:
-        slug               = ctx["slug"]
-        site_images        = ctx.get("site_images", [])
-        important_links    = ctx.get("important_links", [])
-        pages              = ctx.get("pages", [])
-        full_text          = ctx.get("full_text", "")
-        raw_html           = ctx.get("raw_html") or None
-        notification_email = ctx.get("notification_email", "")
-
-        analysis = ctx.get("analysis")
-        if not analysis:
-            analysis_path = TMP / f"{slug}_analysis.json"
-            if analysis_path.exists():
-                analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
-            else:
-                db.update_full_html(generation_id, "##ERROR##:Analysis expired — please paste the URL again to regenerate")
-                return
+    """Queued job: generate full site HTML, save it to the DB and package it.
+    Every stage is checkpointed, so a retry resumes after the last one finished."""
+    slug               = ctx["slug"]
+    site_images        = ctx.get("site_images", [])
+    important_links    = ctx.get("important_links", [])
+    pages              = ctx.get("pages", [])
+    full_text          = ctx.get("full_text", "")
+    raw_html           = ctx.get("raw_html") or None
+    notification_email = ctx.get("notification_email", "")
+
+    analysis = ctx.get("analysis")
+    if not analysis:
+        analysis_path = TMP / f"{slug}_analysis.json"
+        if analysis_path.exists():
+            analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
+        else:
+            db.update_generation_status(generation_id, "error",
+                                        error="Analysis expired — please paste the URL again to regenerate")
+            return
 
+    def _generate() -> str:
         _industry2 = analysis.get("industry", "")
         references = load_reference_images(n=4, industry=_industry2)
 
@@ -649,68 +793,70 @@ def _build_full_site(generation_id: str, ctx: dict) -> None:
         # Restore screenshot from context (stored as base64 dict)
         screenshot_data2 = ctx.get("screenshot_data")
 
-        full_html  = generate_website(
+        return generate_website(
             analysis, references, site_images, full_text, pages, important_links,
             raw_html=raw_html, site_images_data=site_images_data2,
             screenshot_data=screenshot_data2, notification_email=notification_email,
         )
 
-        # ── Reuse the existing hero so it matches the preview exactly ──────────
-        hero_html_full = ctx.get("hero_html_full", "")
-        hero_marker    = "<!-- HERO_END -->"
-        if hero_html_full and hero_marker in hero_html_full and hero_marker in full_html:
-            import re as _re_hero
-            hero_styles = "\n".join(
-                m.group(0) for m in _re_hero.finditer(r'<style[^>]*>.*?</style>', hero_html_full, _re_hero.DOTALL)
-            )
-            hero_body_start   = hero_html_full.find("<body")
-            hero_body_tag_end = hero_html_full.find(">", hero_body_start) + 1
-            hero_end_idx      = hero_html_full.index(hero_marker) + len(hero_marker)
-            preserved_body    = hero_html_full[hero_body_tag_end:hero_end_idx]
-            if hero_styles:
-                full_html = full_html.replace("</head>", hero_styles + "\n</head>", 1)
-            full_body_start   = full_html.find("<body")
-            full_body_tag_end = full_html.find(">", full_body_start) + 1
-            full_hero_end     = full_html.index(hero_marker) + len(hero_marker)
-            full_html = full_html[:full_body_tag_end] + preserved_body + full_html[full_hero_end:]
-            print("[unlock] ✓ Reused hero preview")
-
-        # Apply safety CSS + watermark
-        full_html = full_html.replace('</head>', _build_safety_css() + '\n</head>', 1)
-        full_html = _fix_nav_contrast(full_html)
-        watermark = (
-            '<div style="text-align:center;padding:18px 20px;font-size:11px;'
-            'color:rgba(150,150,150,0.7);font-family:sans-serif;letter-spacing:0.3px;'
-            'border-top:1px solid rgba(150,150,150,0.15);margin-top:0;">'
-            'Website made with '
-            '<a href="https://webisterevive.xyz" target="_blank" '
-            'style="color:inherit;text-decoration:underline;">WebsiteRevive</a>'
-            '</div>'
-        )
-        full_html = full_html.replace('</body>', watermark + '\n</body>')
-
-        # Fact-check the FINAL page (hero + sections) against the scraped source —
-        # strip any invented numbers/years/stats/awards so nothing is made up.
-        full_html = factcheck_pass(full_html, full_text, ctx.get("analysis", {}).get("business_name", ""))
-
-        db.update_full_html(generation_id, full_html)
-        print(f"[unlock] ✓ Job done — {len(full_html):,} chars saved")
-
-    except Exception as e:
-        traceback.print_exc()
-        db.update_full_html(generation_id, f"##ERROR##:{e}")
-        print(f"[unlock] ✗ Job failed: {e}")
+    full_html = _stage(generation_id, "full_html", _generate)
+    full_html = _stage(generation_id, "postprocessed", lambda: _splice_and_finish(generation_id, ctx, full_html))
+
+    # Fact-check the FINAL page (hero + sections) against the scraped source —
+    # strip any invented numbers/years/stats/awards so nothing is made up.
+    full_html = _stage(generation_id, "factchecked",
+                       lambda: factcheck_pass(full_html, full_text, analysis.get("business_name", "")))
+
+    # Package once, before "done" — /status and /unlock only ever serve the artifact
+    db.update_generation_status(generation_id, stage="package")
+    artifact_store.build_once(generation_id, lambda: _package_files(full_html))
+
+    db.update_full_html(generation_id, full_html)
+    print(f"[unlock] ✓ Job done — {len(full_html):,} chars saved")
+
+
+def _packaged(generation: dict) -> dict:
+    """Delivery payload for a finished generation, served from its packaged artifact.
+    Generations without one (packaged before the artifact store, or evicted) are
+    packaged once here; the page body is only fetched in that case."""
+    files = artifact_store.load(
+        generation["id"],
+        lambda: _package_files(db.get_generation_field(generation["id"], "full_html") or ""),
+        ("index.html", "site.zip"))
+    return {
+        "status": "done",
+        "html":   files["index.html"].decode("utf-8"),
+        "zip":    _b64.b64encode(files["site.zip"]).decode(),
+        "slug":   generation["slug"],
+    }
 
 
-def _package_result(generation: dict, full_html: str) -> dict:
-    # Bundle images into the HTML at delivery so the downloaded/exported site is
-    # self-contained and never breaks if the original site goes offline.
-    full_html  = inline_remote_images(full_html)
-    files      = parse_multifile_html(full_html)
-    index_html = files.get("index.html") or next(iter(files.values()), full_html)
-    zip_bytes  = create_zip(files)
-    zip_b64    = _b64.b64encode(zip_bytes).decode()
-    return {"status": "done", "html": index_html, "zip": zip_b64, "slug": generation["slug"]}
+def _package_files(full_html: str) -> tuple[dict, dict]:
+    """Package a finished site → ({"index.html": preview, "site.zip": bytes}, manifest info)."""
+    # Bundle images at delivery so the downloaded/exported site is self-contained
+    # and never breaks if the original site goes offline. In "assets" mode the ZIP
+    # gets one real, content-hashed file per image under assets/ (cacheable, no
+    # base64 overhead) plus responsive WebP widths, so phones don't download desktop
+    # photos; the preview HTML is always inlined since it is shown alone.
+    images     = fetch_delivery_images(full_html)
+    lqips      = image_placeholders(images)
+    files      = {name: stamp_image_attrs(page, images, lqips)
+                  for name, page in parse_multifile_html(full_html).items()}
+    index_raw  = files.get("index.html") or next(iter(files.values()), full_html)
+    data_uris  = data_uri_map(images)
+    index_html = rewrite_image_urls(index_raw, data_uris)
+    if PACKAGE_MODE == "assets":
+        # Real files plus WebP (and optionally AVIF) widths served via <picture>/srcset
+        paths, assets, pictures = responsive_bundle(images)
+        zip_files = {name: picture_rewrite(page, pictures, paths) for name, page in files.items()}
+        zip_files.update(assets)
+    else:
+        zip_files = {name: rewrite_image_urls(page, data_uris) for name, page in files.items()}
+    zip_bytes  = create_zip(zip_files)
+    print(f"[package] {PACKAGE_MODE}: {len(files)} page(s), {len(images)} image(s), ZIP {len(zip_bytes)//1024}KB")
+    info = {"package_mode": PACKAGE_MODE, "pages": sorted(files), "images": len(images),
+            "zip_entries": sorted(zip_files)}
+    return {"index.html": index_html, "site.zip": zip_bytes}, info
 
 
 @app.route("/unlock", methods=["POST"])
@@ -728,38 +874,37 @@ def unlock(user_id):
     if not generation_id:
         return jsonify({"error": "generation_id is required"}), 400
 
-    generation = db.get_generation(generation_id)
+    generation = db.get_generation_status(generation_id)
     if not generation:
         return jsonify({"error": "Generation not found"}), 404
 
-    full_html = generation["full_html"]
+    status = generation["status"]
 
     # ── Still generating → tell frontend to keep polling /status ─────────────
-    if full_html.startswith("##GENERATING##"):
+    if status in db.ACTIVE_STATUSES:
         return jsonify({"status": "generating", "job_id": generation_id})
 
     # ── Legacy pending (from /generate-new) → deduct token + start job ───────
-    if full_html.startswith("##PENDING##:"):
+    if status == "pending":
         if not db.deduct_token(user_id):
             return jsonify({"error": "Not enough tokens"}), 402
         db.mark_unlocked(generation_id)
-        ctx = json.loads(full_html[len("##PENDING##:"):])
+        ctx = json.loads(db.get_generation_field(generation_id, "full_html")[len("##PENDING##:"):])
         if notification_email:
             ctx["notification_email"] = notification_email
             print(f"[unlock] Form submissions → {notification_email}")
-        import time as _time
-        db.update_full_html(generation_id, f"##GENERATING##:{int(_time.time())}")
-        _threading.Thread(target=_build_full_site, args=(generation_id, ctx), daemon=True).start()
-        print(f"[unlock] Background job started for {generation_id}")
+        db.update_generation_status(generation_id, "generating", restart=True)
+        job_queue.enqueue("full_site", {"generation_id": generation_id, "ctx": ctx},
+                          ref=generation_id, job_id=f"{generation_id}:full_site")
         return jsonify({"status": "generating", "job_id": generation_id})
 
     # ── Error from previous attempt ───────────────────────────────────────────
-    if full_html.startswith("##ERROR##:"):
-        return jsonify({"error": full_html[len("##ERROR##:"):]}), 500
+    if status == "error":
+        return jsonify({"error": generation.get("error") or "Generation failed"}), 500
 
     # ── Already unlocked → no second charge (re-download) ────────────────────
     if generation.get("unlocked"):
-        return jsonify(_package_result(generation, full_html))
+        return jsonify(_packaged(generation))
 
     # ── Site is ready — deduct 1 token to unlock download/export ─────────────
     if not db.deduct_token(user_id):
@@ -767,7 +912,7 @@ def unlock(user_id):
 
     db.mark_unlocked(generation_id)
     print(f"[unlock] Token deducted for download — generation {generation_id}")
-    return jsonify(_package_result(generation, full_html))
+    return jsonify(_packaged(generation))
 
 
 @app.route("/refund", methods=["POST"])
@@ -782,7 +927,7 @@ def refund(user_id):
     data          = request.get_json(silent=True) or {}
     generation_id = (data.get("generation_id") or "").strip()
     if generation_id:
-        generation = db.get_generation(generation_id)
+        generation = db.get_generation_status(generation_id)
         if not generation or generation.get("user_id") != user_id:
             return jsonify({"error": "Generation not found"}), 404
         if not generation.get("unlocked"):
@@ -798,31 +943,42 @@ def refund(user_id):
 @app.route("/status/<generation_id>", methods=["GET"])
 def job_status(generation_id):
     user_id = get_current_user_id()  # optional — status is public by generation_id
-    import time as _time
-    generation = db.get_generation(generation_id)
+    from datetime import datetime, timezone
+    hero_only = bool(request.args.get("hero"))  # waitForHero: never package the full site
+    generation = db.get_generation_status(generation_id)
     if not generation:
         return jsonify({"error": "Not found"}), 404
 
-    full_html = generation["full_html"]
-
-    if full_html.startswith("##GENERATING##"):
-        # Check for stuck job: if >10 min since start, treat as error
-        try:
-            started_at = int(full_html.split(":", 1)[1])
-            if _time.time() - started_at > 600:
-                db.update_full_html(generation_id, "##ERROR##:Generation timed out (server restart). Please try again.")
+    status = generation["status"]
+
+    if status in db.ACTIVE_STATUSES:
+        # Check for stuck job: >10 min since start and no queued/running job left
+        # (the queue retries interrupted jobs itself), or a job no worker has picked
+        # up for JOB_STALL_SECONDS (worker down) — treat as error
+        started_at = db.parse_timestamp(generation.get("started_at"))
+        if started_at:
+            age = datetime.now(timezone.utc) - started_at
+            if (age.total_seconds() > 600 and not job_queue.active(generation_id)) or job_queue.stalled(generation_id):
+                job_queue.cancel(generation_id)
+                db.update_generation_status(generation_id, "error",
+                                            error="Generation timed out (server restart). Please try again.")
                 return jsonify({"status": "error", "error": "Generation timed out — please try again"})
-        except (IndexError, ValueError):
-            pass
+        if status == "hero_ready":
+            result = {"status": "hero_ready", "stage": generation.get("stage"), **(generation.get("preview_meta") or {})}
+            if hero_only:                           # the hero body only when asked for
+                result["hero_html"] = db.get_generation_field(generation_id, "hero_html")
+            return jsonify(result)
+        return jsonify({"status": "generating", "stage": generation.get("stage")})
+
+    if status == "pending":
         return jsonify({"status": "generating"})
 
-    if full_html.startswith("##PENDING##:"):
-        return jsonify({"status": "generating"})
-
-    if full_html.startswith("##ERROR##:"):
-        return jsonify({"status": "error", "error": full_html[len("##ERROR##:"):]})
+    if status == "error":
+        return jsonify({"status": "error", "error": generation.get("error") or "Generation failed"})
 
-    return jsonify(_package_result(generation, full_html))
+    if hero_only:
+        return jsonify({"status": "done"})      # startAutoPolling fetches the packaged site
+    return jsonify(_packaged(generation))
 
 
 # ── Checkout ──────────────────────────────────────────────────────────────────
@@ -971,7 +1127,7 @@ def hosting_checkout(user_id):
     if not generation_id:
         return jsonify({"error": "generation_id is required"}), 400
 
-    generation = db.get_generation(generation_id)
+    generation = db.get_generation_status(generation_id)
     if not generation:
         return jsonify({"error": "Generation not found"}), 404
 
@@ -4,6 +4,9 @@ Gunicorn entry point for Render deployment.
 
 Start command (render.yaml):
     gunicorn wsgi:app --bind 0.0.0.0:$PORT --workers 2 --timeout 300
+
+gunicorn.conf.py (loaded automatically) also starts the job worker process,
+tools/job_worker.py, which runs the queued generation jobs.
 """
 
 import sys